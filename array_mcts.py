@@ -0,0 +1,145 @@
+import math
+import random
+import time
+import numpy as np
+from mcts import MCTS
+
+class ArrayTree():
+    # Structure-of-arrays tree. The children of a node are allocated as one
+    # contiguous block, so the next sibling of node i is i + 1 and a node's
+    # children are first_child[i] .. first_child[i] + num_children[i] - 1.
+    # Boards are not stored; they are rebuilt by replaying actions from the root.
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.score = np.zeros(capacity, dtype=np.int32)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int8)
+        self.action = np.zeros(capacity, dtype=np.int8)
+        # node 0 is the root
+        self.size = 1
+
+    def grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, fill in (('visits', 0), ('score', 0), ('parent', -1),
+                           ('first_child', -1), ('num_children', 0), ('action', 0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def add_children(self, node, actions):
+        first = self.size
+        end = first + len(actions)
+        if end > self.capacity:
+            self.grow(end)
+        self.visits[first:end] = 0
+        self.score[first:end] = 0
+        self.parent[first:end] = node
+        self.first_child[first:end] = -1
+        self.num_children[first:end] = 0
+        self.action[first:end] = actions
+        self.first_child[node] = first
+        self.num_children[node] = len(actions)
+        self.size = end
+
+    def children(self, node):
+        first = int(self.first_child[node])
+        return range(first, first + int(self.num_children[node]))
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in
+                   ('visits', 'score', 'parent', 'first_child', 'num_children', 'action'))
+
+class ArrayMCTS(MCTS):
+    def __init__(self, capacity=1024, **options):
+        super().__init__(**options)
+        if self.solver:
+            raise ValueError("ArrayMCTS keeps no proven values, solver is not supported")
+        # options of the Node tree that the arrays do not implement
+        for name in ('max_nodes', 'max_bytes', 'transpositions', 'book', 'store'):
+            if getattr(self, name) is not None:
+                raise ValueError(f"ArrayMCTS does not support {name}")
+        if self.symmetry_depth:
+            raise ValueError("ArrayMCTS does not support symmetry_depth")
+        self.capacity = capacity
+
+    def search(self, initial_state, max_iterations=1000, time_budget_ms=None):
+        self.tree = ArrayTree(self.capacity)
+        self.root_board = initial_state
+
+        start_time = time.time()
+        self.run(max_iterations, time_budget_ms)
+
+        root = self.export_root()
+        best_move = self.choose_move(root)
+        children = root.children
+
+        if self.verbose:
+            print(f"Time taken: {time.time() - start_time}")
+        return best_move, children
+
+    def iterate(self):
+        node, board = self.select(0)
+        score, visits = self.simulate(board)
+        self.backpropagate(node, score, visits)
+
+    def root_child_visits(self):
+        return self.tree.visits[self.tree.children(0)].tolist()
+
+    def select(self, node):
+        tree = self.tree
+        board = self.root_board.copy()
+        while not board.is_terminal():
+            if tree.num_children[node] == 0:
+                tree.add_children(node, board.legal_actions())
+            sign = 1 if board.player_1 == self.perspective else -1
+            node = self.select_child(node, sign, self.exploration)
+            board.apply(int(tree.action[node]))
+            if tree.visits[node] == 0:
+                break
+        return node, board
+
+    def select_child(self, node, sign, exploration_constant):
+        # Scores every child of the node in one pass over its contiguous
+        # visits/score block. Unvisited children come first, in block order,
+        # as in MCTS.expand.
+        tree = self.tree
+        first = int(tree.first_child[node])
+        end = first + int(tree.num_children[node])
+        visits = tree.visits[first:end].tolist()
+        if 0 in visits:
+            return first + visits.index(0)
+
+        scores = tree.score[first:end].tolist()
+        log_parent = math.log(tree.visits[node])
+        move_scores = [sign * score / child_visits
+                       + exploration_constant * math.sqrt(log_parent - math.log(child_visits))
+                       for score, child_visits in zip(scores, visits)]
+        best_score = max(move_scores)
+        if move_scores.count(best_score) > 1:
+            best_moves = [i for i, move_score in enumerate(move_scores) if move_score == best_score]
+            return first + random.choice(best_moves)
+        return first + move_scores.index(best_score)
+
+    def backpropagate(self, node, score, visits=1):
+        tree = self.tree
+        while node != -1:
+            tree.visits[node] += visits
+            tree.score[node] += score
+            node = tree.parent[node]
+
+    def export_root(self):
+        # Materialize the root and its visited children as Nodes so callers get
+        # the same (best_move, children) shape as the object tree.
+        tree = self.tree
+        stats = {}
+        for child in tree.children(0):
+            if tree.visits[child]:
+                stats[int(tree.action[child])] = (int(tree.visits[child]), int(tree.score[child]), None)
+        return self.build_root(self.root_board, stats)
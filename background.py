@@ -0,0 +1,170 @@
+import multiprocessing
+import time
+import traceback
+from mcts import MCTS
+
+# Seconds between root statistic reports from a running search
+REPORT_INTERVAL = 0.05
+
+def root_stats(mcts):
+    # proven values go along so the caller's choose_move plays a proven win
+    return {action: (child.visits, child.score, child.proven)
+            for action, child in mcts.root_children().items() if child.visits}
+
+def search_worker(connection, mcts_class, options):
+    # Runs in the worker process. The MCTS instance lives as long as the
+    # process, so advance() keeps the tree between moves as in a local search.
+    mcts = mcts_class(verbose=False, **options)
+    task = None
+    reporting = False
+    last_report = 0.0
+
+    def on_check(iterations):
+        nonlocal last_report
+        now = time.monotonic()
+        if reporting and now - last_report >= REPORT_INTERVAL:
+            last_report = now
+            connection.send(('stats', task, root_stats(mcts)))
+        # any new command interrupts the running search
+        return connection.poll()
+
+    mcts.on_check = on_check
+    while True:
+        command, task, *args = connection.recv()
+        if command == 'close':
+            if mcts.store is not None:
+                mcts.store.flush()
+            return
+        try:
+            if command == 'advance':
+                mcts.advance(*args)
+            elif command == 'search':
+                state, max_iterations, time_budget_ms, count_existing = args
+                reporting = True
+                mcts.set_root(state)
+                booked = mcts.book_stats(state)
+                if booked is not None:
+                    connection.send(('result', task, booked))
+                    continue
+                if count_existing and max_iterations is not None:
+                    # only spend what pondering and earlier moves have not already spent
+                    max_iterations = max(0, max_iterations - mcts.root.visits // mcts.playouts)
+                mcts.run(max_iterations, time_budget_ms)
+                if not connection.poll():
+                    connection.send(('result', task, root_stats(mcts)))
+            elif command == 'ponder':
+                state, max_iterations = args
+                # nobody polls while pondering, so no reports that would fill the pipe
+                reporting = False
+                mcts.set_root(state)
+                mcts.run(max_iterations)
+        except Exception:
+            # report the failure to the caller instead of dying silently; the
+            # tree may be half updated, so the next search starts a new one
+            mcts.root = None
+            connection.send(('error', task, traceback.format_exc()))
+
+class BackgroundSearch():
+    # Runs MCTS searches in a worker process so the caller's loop keeps
+    # running. start() returns immediately; poll() is called every frame and
+    # returns (best_move, children) once the search has finished, None before.
+    # Root statistics reported while it runs are in self.stats. A search that
+    # fails in the worker, or a worker that has exited, raises RuntimeError
+    # from the call that finds out.
+    def __init__(self, mcts_class=MCTS, **options):
+        self.mcts = mcts_class(verbose=False, **options)
+        context = multiprocessing.get_context('spawn')
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=search_worker, args=(worker_connection, mcts_class, options),
+                                       daemon=True)
+        self.process.start()
+        self.task = 0
+        self.state = None
+        self.stats = {}
+        self.running = False
+
+    def start(self, state, max_iterations=1000, time_budget_ms=None, count_existing=False):
+        # With count_existing the visits already under state (from pondering or
+        # tree reuse) count against max_iterations
+        self.task += 1
+        self.state = state
+        self.stats = {}
+        self.running = True
+        self.send('search', self.task, state, max_iterations, time_budget_ms, count_existing)
+
+    def ponder(self, state, max_iterations=None):
+        # Keep growing the tree from state, typically while the opponent is
+        # thinking, until the next command. Follow it with advance(reply) and
+        # start(..., count_existing=True) once the reply is known. Nothing to
+        # do when the book answers every position a reply can lead to.
+        if self.is_booked_after_reply(state):
+            return
+        self.send('ponder', self.task, state, max_iterations)
+
+    def is_booked_after_reply(self, state):
+        if self.mcts.book is None:
+            return False
+        for action in state.legal_actions():
+            board = state.copy()
+            board.apply(action)
+            if not board.is_terminal() and self.mcts.book_stats(board) is None:
+                return False
+        return True
+
+    def send(self, *message):
+        try:
+            self.connection.send(message)
+        except OSError:
+            self.worker_exited()
+
+    def worker_exited(self):
+        self.running = False
+        raise RuntimeError(f"search worker exited with code {self.process.exitcode}")
+
+    def poll(self):
+        result = None
+        try:
+            while self.connection.poll():
+                message, task, payload = self.connection.recv()
+                if message == 'error':
+                    self.running = False
+                    raise RuntimeError(f"search worker failed:\n{payload}")
+                if task != self.task or not self.running:
+                    continue
+                self.stats = payload
+                if message == 'result':
+                    self.running = False
+                    result = self.result()
+        except (EOFError, OSError):
+            self.worker_exited()
+        return result
+
+    def result(self):
+        root = self.mcts.build_root(self.state, self.stats)
+        return self.mcts.choose_move(root), root.children
+
+    def live_children(self):
+        # Nodes for the statistics reported so far, e.g. to draw them
+        root = self.mcts.build_root(self.state, self.stats)
+        if root.children:
+            self.mcts.get_best_move(root, 0)
+        return root.children
+
+    def cancel(self):
+        if self.running:
+            self.running = False
+            self.task += 1
+            self.send('cancel', self.task)
+
+    def advance(self, action):
+        self.send('advance', self.task, action)
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.connection.send(('close', self.task))
+            except OSError:
+                pass
+            self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
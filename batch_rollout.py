@@ -0,0 +1,95 @@
+import numpy as np
+from connect4 import ConnectFour, COLUMN_HEIGHT, TOP_BITS, MAX_MOVES
+from tictactoe import TicTacToe, WIN_MASKS
+
+# Playouts advance in lock-step: every game in the batch starts from the same
+# board, so all of them are on the same ply and only the finished ones drop out.
+
+rng = np.random.default_rng()
+
+def seed(value):
+    global rng
+    rng = np.random.default_rng(value)
+
+CONNECT_FOUR_SHIFTS = [np.uint64(shift) for shift in (1, COLUMN_HEIGHT, COLUMN_HEIGHT - 1, COLUMN_HEIGHT + 1)]
+CONNECT_FOUR_TOPS = np.array(TOP_BITS, dtype=np.int64)
+TICTACTOE_WIN_MASKS = np.array(WIN_MASKS, dtype=np.int16)
+TICTACTOE_SQUARES = np.int16(1) << np.arange(9, dtype=np.int16)
+
+def connect_four_wins(bitboards):
+    won = np.zeros(len(bitboards), dtype=bool)
+    for shift in CONNECT_FOUR_SHIFTS:
+        pairs = bitboards & (bitboards >> shift)
+        won |= (pairs & (pairs >> (shift + shift))) != 0
+    return won
+
+def tictactoe_wins(bitboards):
+    return ((bitboards[:, None] & TICTACTOE_WIN_MASKS) == TICTACTOE_WIN_MASKS).any(axis=1)
+
+def random_columns(legal):
+    # uniform choice among the legal entries of each row
+    weights = rng.random(legal.shape)
+    weights[~legal] = -1
+    return weights.argmax(axis=1)
+
+def connect_four_playouts(board, count, perspective):
+    if board.is_terminal():
+        return np.full(count, board.result(perspective), dtype=np.int8)
+
+    results = np.zeros(count, dtype=np.int8)
+    games = np.arange(count)
+    mover = np.full(count, board.bitboards[len(board.moves) & 1], dtype=np.uint64)
+    waiting = np.full(count, board.bitboards[(len(board.moves) + 1) & 1], dtype=np.uint64)
+    heights = np.tile(np.array(board.heights, dtype=np.int64), (count, 1))
+    sign = 1 if board.player_1 == perspective else -1
+
+    for _ in range(len(board.moves), MAX_MOVES):
+        cols = random_columns(heights < CONNECT_FOUR_TOPS)
+        rows = np.arange(len(games))
+        mover |= np.left_shift(np.uint64(1), heights[rows, cols].astype(np.uint64))
+        heights[rows, cols] += 1
+
+        won = connect_four_wins(mover)
+        if won.any():
+            results[games[won]] = sign
+            playing = ~won
+            games, mover, waiting, heights = games[playing], mover[playing], waiting[playing], heights[playing]
+            if not len(games):
+                break
+        (mover, waiting) = (waiting, mover)
+        sign = -sign
+    return results
+
+def tictactoe_playouts(board, count, perspective):
+    if board.is_terminal():
+        return np.full(count, board.result(perspective), dtype=np.int8)
+
+    results = np.zeros(count, dtype=np.int8)
+    games = np.arange(count)
+    mover = np.full(count, board.bitboards[board.move_count & 1], dtype=np.int16)
+    waiting = np.full(count, board.bitboards[(board.move_count + 1) & 1], dtype=np.int16)
+    sign = 1 if board.player_1 == perspective else -1
+
+    for _ in range(board.move_count, 9):
+        occupied = mover | waiting
+        squares = random_columns((occupied[:, None] & TICTACTOE_SQUARES) == 0)
+        mover |= TICTACTOE_SQUARES[squares]
+
+        won = tictactoe_wins(mover)
+        if won.any():
+            results[games[won]] = sign
+            playing = ~won
+            games, mover, waiting = games[playing], mover[playing], waiting[playing]
+            if not len(games):
+                break
+        (mover, waiting) = (waiting, mover)
+        sign = -sign
+    return results
+
+def playouts(board, count, perspective):
+    # Results of count random playouts from board, +1 where perspective wins
+    if isinstance(board, ConnectFour):
+        return connect_four_playouts(board, count, perspective)
+    if isinstance(board, TicTacToe):
+        return tictactoe_playouts(board, count, perspective)
+    raise TypeError(f"no batched playouts for {type(board).__name__}")
@@ -0,0 +1,253 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import batch_rollout
+from connect4 import ConnectFour
+from evaluator import EvaluatorMCTS, ThreatEvaluator
+from mcts import MCTS
+from rave import RaveMCTS
+from rollout_policies import POLICIES
+from tictactoe import TicTacToe
+from transposition import TranspositionTable
+
+try:
+    import resource
+except ImportError:
+    # Windows has no getrusage; peak RSS is then not reported
+    resource = None
+
+GAMES = {'tictactoe': TicTacToe, 'connect4': ConnectFour}
+SIMULATORS = {'rollout': None, 'batch': batch_rollout.playouts}
+# leaf evaluators and the game each one reads
+EVALUATORS = {'threat': (ThreatEvaluator, 'connect4')}
+# rollout policies that only play one game; the others play any
+POLICY_GAMES = {'center': 'connect4', 'tactical': 'connect4'}
+PERCENTILES = (50, 90, 99)
+
+# A player is NAME:key=value,... e.g. fast:iterations=500,exploration=1.4
+# Keys and how they map onto MCTS options:
+#   iterations   max_iterations per move (default 1000)
+#   time_ms      time budget per move
+#   exploration  UCT exploration constant
+#   simulator    rollout (one scalar playout per leaf) or batch (NumPy batches)
+#   playouts     playouts per leaf with simulator=batch
+#   policy       scalar rollout policy: uniform, center or tactical
+#   symmetry     symmetry_depth, plies below the root where symmetric moves are collapsed
+#   rave         RAVE equivalence parameter; plays with RaveMCTS when given
+#   evaluator    leaf evaluator instead of rollouts (threat); plays with EvaluatorMCTS when given
+#   batch        leaves per evaluator call (default 8)
+#   max_nodes    node budget of the tree, least-visited subtrees are recycled beyond it
+#   solver, early_stop, transpositions   0 or 1
+PLAYER_KEYS = {'iterations': int, 'time_ms': int, 'exploration': float, 'simulator': str, 'playouts': int,
+               'policy': str, 'symmetry': int, 'rave': int, 'evaluator': str, 'batch': int, 'max_nodes': int, 'solver': int,
+               'early_stop': int, 'transpositions': int}
+
+def parse_player(text):
+    name, _, spec = text.partition(':')
+    config = {'name': name, 'iterations': 1000}
+    for item in filter(None, spec.split(',')):
+        key, _, value = item.partition('=')
+        if key not in PLAYER_KEYS:
+            raise argparse.ArgumentTypeError(f"unknown player option {key!r}")
+        config[key] = PLAYER_KEYS[key](value)
+    if config.get('simulator', 'rollout') not in SIMULATORS:
+        raise argparse.ArgumentTypeError(f"unknown simulator {config['simulator']!r}")
+    if config.get('policy', 'uniform') not in POLICIES:
+        raise argparse.ArgumentTypeError(f"unknown rollout policy {config['policy']!r}")
+    if config.get('evaluator', 'threat') not in EVALUATORS:
+        raise argparse.ArgumentTypeError(f"unknown evaluator {config['evaluator']!r}")
+    return config
+
+class Counting():
+    # Counts the nodes each search adds to the tree
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.nodes = 0
+
+    def expand(self, node):
+        self.nodes += 1
+        return super().expand(node)
+
+class CountingMCTS(Counting, MCTS):
+    pass
+
+class CountingRaveMCTS(Counting, RaveMCTS):
+    pass
+
+class CountingEvaluatorMCTS(Counting, EvaluatorMCTS):
+    pass
+
+def make_player(config, perspective):
+    options = {'perspective': perspective, 'verbose': False}
+    if 'exploration' in config:
+        options['exploration'] = config['exploration']
+    if config.get('simulator') == 'batch':
+        options['simulator'] = batch_rollout.playouts
+        options['playouts'] = config.get('playouts', 64)
+    if 'policy' in config:
+        options['policy'] = POLICIES[config['policy']]
+    if 'symmetry' in config:
+        options['symmetry_depth'] = config['symmetry']
+    if 'max_nodes' in config:
+        options['max_nodes'] = config['max_nodes']
+    for key in ('solver', 'early_stop'):
+        options[key] = bool(config.get(key))
+    if config.get('transpositions'):
+        options['transpositions'] = TranspositionTable()
+    if 'rave' in config:
+        return CountingRaveMCTS(rave_equivalence=config['rave'], **options)
+    if 'evaluator' in config:
+        return CountingEvaluatorMCTS(evaluator=EVALUATORS[config['evaluator']][0](), batch_size=config.get('batch', 8), **options)
+    return CountingMCTS(**options)
+
+def peak_rss_kb():
+    # peak resident set size of this process in KiB, None where unknown
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def play_game(game, configs, seed):
+    # Runs in a worker process. configs[0] moves first. Returns the winner's
+    # index (None for a draw) and each side's search measurements.
+    random.seed(seed)
+    batch_rollout.seed(seed)
+    board = GAMES[game]()
+    players = [make_player(configs[0], board.player_1), make_player(configs[1], board.player_2)]
+    stats = [{'latencies': [], 'iterations': 0, 'playouts': 0, 'nodes': 0, 'seconds': 0.0} for _ in players]
+    turn = 0
+    while not board.is_terminal():
+        mcts, config, side = players[turn], configs[turn], stats[turn]
+        nodes = mcts.nodes
+        start = time.perf_counter()
+        best_move, _ = mcts.search(board, config['iterations'], config.get('time_ms'))
+        elapsed = time.perf_counter() - start
+        side['latencies'].append(elapsed)
+        side['seconds'] += elapsed
+        side['iterations'] += mcts.iterations
+        side['playouts'] += mcts.iterations * mcts.playouts
+        side['nodes'] += mcts.nodes - nodes
+        board = best_move.board
+        for player in players:
+            player.advance(best_move.action)
+        turn = 1 - turn
+    winner = None
+    if board.is_win():
+        # the side that made the last move won
+        winner = 1 - turn
+    return {'winner': winner, 'moves': len(stats[0]['latencies']) + len(stats[1]['latencies']),
+            'stats': stats, 'max_rss_kb': peak_rss_kb()}
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+def elo_difference(score):
+    # Elo gap implied by an expected score, clamped where it diverges
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+def summarize_player(config, results):
+    latencies = [latency for side in results for latency in side['latencies']]
+    seconds = sum(side['seconds'] for side in results)
+    summary = {'config': config, 'moves': len(latencies)}
+    for key in ('iterations', 'playouts', 'nodes'):
+        summary[f"{key}_per_second"] = sum(side[key] for side in results) / seconds if seconds else 0
+    summary['latency_ms'] = {f"p{q}": percentile(latencies, q) * 1000 for q in PERCENTILES if latencies}
+    if latencies:
+        summary['latency_ms']['max'] = max(latencies) * 1000
+    return summary
+
+def run_arena(game, configs, games_per_pair, workers, seed):
+    tasks = []
+    for (a, b) in itertools.combinations(range(len(configs)), 2):
+        for game_index in range(games_per_pair):
+            # alternate who moves first
+            order = (a, b) if game_index % 2 == 0 else (b, a)
+            tasks.append((order, seed + len(tasks)))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_game, game, [configs[i] for i in order], task_seed)
+                   for order, task_seed in tasks]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    sides = [[] for _ in configs]
+    pairs = {}
+    for (order, _), result in zip(tasks, results):
+        for index, side in zip(order, result['stats']):
+            sides[index].append(side)
+        a, b = sorted(order)
+        record = pairs.setdefault((a, b), {'wins': 0, 'draws': 0, 'losses': 0})
+        if result['winner'] is None:
+            record['draws'] += 1
+        elif order[result['winner']] == a:
+            record['wins'] += 1
+        else:
+            record['losses'] += 1
+
+    pair_summaries = []
+    for (a, b), record in sorted(pairs.items()):
+        games = record['wins'] + record['draws'] + record['losses']
+        score = (record['wins'] + record['draws'] / 2) / games
+        pair_summaries.append(dict(record, player=configs[a]['name'], opponent=configs[b]['name'],
+                                   games=games, score=score, elo=elo_difference(score)))
+    return {
+        'game': game,
+        'games': len(tasks),
+        'workers': workers,
+        'seconds': elapsed,
+        'peak_rss_kb': max((result['max_rss_kb'] for result in results if result['max_rss_kb'] is not None),
+                           default=None),
+        'python': sys.version.split()[0],
+        'players': [summarize_player(config, side) for config, side in zip(configs, sides)],
+        'pairs': pair_summaries,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless AI-vs-AI arena: throughput, latency and Elo between MCTS configurations.')
+    parser.add_argument('--game', choices=sorted(GAMES), default='connect4')
+    parser.add_argument('--player', type=parse_player, action='append', dest='players',
+                        help='NAME:key=value,... (at least two); see PLAYER_KEYS')
+    parser.add_argument('--games', type=int, default=100, help='games per pair of players')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+    players = args.players or [parse_player('uct2:exploration=2'), parse_player('uct1:exploration=1')]
+    if len(players) < 2:
+        parser.error('need at least two players')
+    for player in players:
+        if 'evaluator' in player and EVALUATORS[player['evaluator']][1] != args.game:
+            parser.error(f"evaluator {player['evaluator']!r} only evaluates {EVALUATORS[player['evaluator']][1]}")
+        if POLICY_GAMES.get(player.get('policy'), args.game) != args.game:
+            parser.error(f"rollout policy {player['policy']!r} only plays {POLICY_GAMES[player['policy']]}")
+
+    report = run_arena(args.game, players, args.games, args.workers, args.seed)
+    peak_rss = 'unknown' if report['peak_rss_kb'] is None else f"{report['peak_rss_kb'] / 1024:.1f} MiB"
+    print(f"{report['games']} {report['game']} games in {report['seconds']:.1f}s on {report['workers']} workers, "
+          f"peak RSS {peak_rss}")
+    for player in report['players']:
+        latency = player['latency_ms']
+        print(f"{player['config']['name']:>12}: {player['playouts_per_second']:9.0f} playouts/s, "
+              f"{player['nodes_per_second']:9.0f} nodes/s, latency p50 {latency['p50']:.1f} ms, "
+              f"p90 {latency['p90']:.1f} ms, p99 {latency['p99']:.1f} ms")
+    for pair in report['pairs']:
+        print(f"{pair['player']:>12} vs {pair['opponent']}: +{pair['wins']} ={pair['draws']} -{pair['losses']}, "
+              f"score {pair['score']:.3f}, Elo {pair['elo']:+.0f}")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == '__main__':
+    main()
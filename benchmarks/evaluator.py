@@ -0,0 +1,48 @@
+import argparse
+import os
+import time
+from benchmarks.arena import run_arena
+from benchmarks.rollout_policies import playout_speed, sample_positions
+from evaluator import ThreatEvaluator
+from rollout_policies import uniform
+
+def evaluation_speed(evaluator, positions, batch_size, repeat):
+    evaluations = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for index in range(0, len(positions), batch_size):
+            batch = positions[index:index + batch_size]
+            evaluator(batch)
+            evaluations += len(batch)
+    return evaluations / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='Connect Four leaf evaluation: threat evaluator throughput by batch '
+                                                 'size against random playouts, then EvaluatorMCTS against rollout '
+                                                 'MCTS at equal time per move.')
+    parser.add_argument('--positions', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--games', type=int, default=40, help='games against rollouts per batch size')
+    parser.add_argument('--time-ms', type=int, default=50, help='search time per move')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions, args.seed)
+    playouts_per_second, _ = playout_speed(uniform, positions, args.repeat)
+    print(f"   random playouts: {playouts_per_second:9.0f} leaves/s")
+    evaluator = ThreatEvaluator()
+    for batch_size in args.batch_sizes:
+        print(f"threat batch of {batch_size:3d}: {evaluation_speed(evaluator, positions, batch_size, args.repeat):9.0f} leaves/s")
+
+    for batch_size in args.batch_sizes:
+        name = f"threat{batch_size}"
+        players = [{'name': name, 'iterations': None, 'time_ms': args.time_ms, 'evaluator': 'threat', 'batch': batch_size},
+                   {'name': 'rollout', 'iterations': None, 'time_ms': args.time_ms}]
+        pair, = run_arena('connect4', players, args.games, args.workers, args.seed)['pairs']
+        print(f"{name:>9} vs rollout at {args.time_ms} ms/move: +{pair['wins']} ={pair['draws']} -{pair['losses']}, "
+              f"score {pair['score']:.3f}, Elo {pair['elo']:+.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import random
+import time
+from benchmarks.arena import run_arena
+from connect4 import ConnectFour
+from mcts import MCTS
+from rollout_policies import POLICIES
+
+def sample_positions(count, seed):
+    # Non-terminal positions from random games, 0 to 20 plies in
+    generator = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = ConnectFour()
+        for _ in range(generator.randrange(21)):
+            board.play(generator.choice(board.legal_actions()))
+            if board.is_terminal():
+                break
+        if not board.is_terminal():
+            positions.append(board)
+    return positions
+
+def playout_speed(policy, positions, repeat):
+    mcts = MCTS(policy=policy, verbose=False)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in positions:
+            moves += mcts.playout(board).ply() - board.ply()
+    elapsed = time.perf_counter() - start
+    return repeat * len(positions) / elapsed, moves / (repeat * len(positions))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare Connect Four rollout policies: playout speed, '
+                                                 'then strength against uniform rollouts at equal time per move.')
+    parser.add_argument('--positions', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--games', type=int, default=40, help='games against uniform per policy')
+    parser.add_argument('--time-ms', type=int, default=100, help='search time per move')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions, args.seed)
+    for name, policy in POLICIES.items():
+        playouts_per_second, length = playout_speed(policy, positions, args.repeat)
+        print(f"{name:>9}: {playouts_per_second:8.0f} playouts/s, {length:4.1f} moves per playout")
+
+    for name in POLICIES:
+        if name == 'uniform':
+            continue
+        players = [{'name': name, 'iterations': None, 'time_ms': args.time_ms, 'policy': name},
+                   {'name': 'uniform', 'iterations': None, 'time_ms': args.time_ms, 'policy': 'uniform'}]
+        pair, = run_arena('connect4', players, args.games, args.workers, args.seed)['pairs']
+        print(f"{name:>9} vs uniform at {args.time_ms} ms/move: +{pair['wins']} ={pair['draws']} -{pair['losses']}, "
+              f"score {pair['score']:.3f}, Elo {pair['elo']:+.0f}")
+
+if __name__ == '__main__':
+    main()
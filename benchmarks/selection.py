@@ -0,0 +1,120 @@
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+import numpy as np
+from array_mcts import ArrayMCTS
+from connect4 import ConnectFour
+
+OPENING = [3, 3, 2, 4, 4, 2, 3, 5, 1, 1]
+
+class LoopSelectionMCTS(ArrayMCTS):
+    # Per-child loop with one NumPy scalar read per field, as MCTS.get_best_move does on Nodes
+    def select_child(self, node, sign, exploration_constant):
+        tree = self.tree
+        children = tree.children(node)
+        for child in children:
+            if tree.visits[child] == 0:
+                return child
+
+        parent_visits = int(tree.visits[node])
+        best_score = float('-inf')
+        best_moves = []
+        for child in children:
+            visits = int(tree.visits[child])
+            exploration = exploration_constant * math.sqrt(math.log(parent_visits / visits))
+            exploitation = sign * int(tree.score[child]) / visits
+            move_score = exploitation + exploration
+
+            if move_score > best_score:
+                best_score = move_score
+                best_moves = [child]
+            elif move_score == best_score:
+                best_moves.append(child)
+        return random.choice(best_moves)
+
+class UfuncSelectionMCTS(ArrayMCTS):
+    # Whole-block NumPy ufuncs; per-call dispatch dominates at Connect Four's 7 children
+    def select_child(self, node, sign, exploration_constant):
+        tree = self.tree
+        first = int(tree.first_child[node])
+        end = first + int(tree.num_children[node])
+        visits = tree.visits[first:end]
+        best = int(visits.argmin())
+        if visits[best] == 0:
+            return first + best
+
+        move_scores = np.log(tree.visits[node] / visits)
+        np.sqrt(move_scores, out=move_scores)
+        move_scores *= exploration_constant
+        move_scores += sign * tree.score[first:end] / visits
+        best = int(move_scores.argmax())
+        best_moves = move_scores == move_scores[best]
+        if np.count_nonzero(best_moves) > 1:
+            best = int(random.choice(best_moves.nonzero()[0]))
+        return first + best
+
+VARIANTS = (('loop', LoopSelectionMCTS), ('ufunc', UfuncSelectionMCTS), ('block', ArrayMCTS))
+
+def build_tree(board, iterations, seed):
+    random.seed(seed)
+    mcts = ArrayMCTS()
+    with contextlib.redirect_stdout(io.StringIO()):
+        mcts.search(board, iterations)
+    return mcts.tree
+
+def expanded_nodes(tree):
+    # Internal nodes whose children have all been visited, with their depth
+    depth = np.zeros(tree.size, dtype=np.int32)
+    nodes = []
+    for node in range(1, tree.size):
+        depth[node] = depth[tree.parent[node]] + 1
+    for node in range(tree.size):
+        children = tree.children(node)
+        if len(children) and all(tree.visits[child] > 0 for child in children):
+            nodes.append((node, int(depth[node])))
+    return nodes
+
+def time_selection(mcts_class, tree, nodes, repeat):
+    mcts = mcts_class()
+    mcts.tree = tree
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for node, _ in nodes:
+            mcts.select_child(node, 1, 2)
+    return (time.perf_counter() - start) / (repeat * len(nodes)) * 1e6
+
+def time_search(mcts_class, board, iterations, seed):
+    random.seed(seed)
+    mcts = mcts_class()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        mcts.search(board, iterations)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare UCT child selection strategies on a Connect Four tree.')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    board = ConnectFour()
+    for col in OPENING:
+        board.play(col)
+
+    tree = build_tree(board, args.iterations, args.seed)
+    nodes = expanded_nodes(tree)
+    depths = [depth for _, depth in nodes]
+    print(f"{len(nodes)} fully expanded nodes after {len(OPENING)} plies, "
+          f"mean depth {sum(depths) / len(depths):.1f}, max depth {max(depths)}")
+
+    for name, mcts_class in VARIANTS:
+        select_us = time_selection(mcts_class, tree, nodes, args.repeat)
+        iteration_us = time_search(mcts_class, board, args.iterations, args.seed)
+        print(f"{name:>6}: select_child {select_us:6.1f} us/call, search {iteration_us:6.1f} us/iteration")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+import time
+import batch_rollout
+from connect4 import ConnectFour
+from parallel import TreeParallelMCTS
+
+MODES = {
+    'scalar': {},
+    'batch': {'simulator': batch_rollout.playouts, 'playouts': 64},
+}
+
+def gil_enabled():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+def run(threads, iterations, options):
+    mcts = TreeParallelMCTS(threads=threads, verbose=False, **options)
+    start = time.perf_counter()
+    mcts.search(ConnectFour(), iterations)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed, mcts.root.visits / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Tree-parallel MCTS scaling on Connect Four from 1 to N threads.')
+    parser.add_argument('--max-threads', type=int, default=os.cpu_count())
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--mode', choices=sorted(MODES), nargs='+', default=sorted(MODES))
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled() else 'disabled'}, "
+          f"{os.cpu_count()} CPUs")
+    for mode in args.mode:
+        base = None
+        for threads in range(1, args.max_threads + 1):
+            iterations_per_second, playouts_per_second = run(threads, args.iterations, MODES[mode])
+            base = base or iterations_per_second
+            print(f"{mode:>6} {threads:2d} threads: {iterations_per_second:9.0f} iterations/s, "
+                  f"{playouts_per_second:10.0f} playouts/s, speedup {iterations_per_second / base:.2f}x")
+
+if __name__ == '__main__':
+    main()
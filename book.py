@@ -0,0 +1,203 @@
+import argparse
+import mmap
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from connect4 import ConnectFour
+from mcts import MCTS
+from tictactoe import TicTacToe
+
+# On-disk layout, little-endian:
+#   header  magic, format version, game name, booked plies, slot count, CRC-32 of the slots
+#   slots   open-addressing hash table of (zobrist, action, value), slot count a power of two
+# A position's home slot is its Zobrist hash modulo the slot count; lookups
+# probe linearly from there to the first empty slot.
+MAGIC = b'MCTSBOOK'
+VERSION = 1
+HEADER = struct.Struct('<8sH16sHII')
+SLOT = struct.Struct('<QbB6x')
+# Slot values are the perfect-play result for the player to move, or
+# UNKNOWN for moves taken from a search that did not solve the position.
+EMPTY, LOSS, DRAW, WIN, UNKNOWN = range(5)
+RESULTS = {LOSS: -1, DRAW: 0, WIN: 1, UNKNOWN: None}
+MAX_LOAD = 0.75
+
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'books')
+TICTACTOE_BOOK = os.path.join(BOOK_DIR, 'tictactoe.book')
+CONNECT4_BOOK = os.path.join(BOOK_DIR, 'connect4.book')
+
+class OpeningBook():
+    # Read-only view of a book file. The file is memory-mapped, so opening it
+    # costs a header read and the CRC check, and a lookup touches a slot or two.
+    def __init__(self, path, verify=True):
+        self.path = path
+        self.verify = verify
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path}: not an opening book")
+        magic, version, game, self.plies, self.slots, checksum = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not an opening book")
+        if version != VERSION:
+            raise ValueError(f"{path}: book format version {version}, expected {VERSION}")
+        if len(self.data) != HEADER.size + self.slots * SLOT.size:
+            raise ValueError(f"{path}: truncated book")
+        if verify and zlib.crc32(self.data[HEADER.size:]) != checksum:
+            raise ValueError(f"{path}: checksum mismatch")
+        self.game = game.rstrip(b'\0').decode()
+        self.mask = self.slots - 1
+        # board class last checked against self.game
+        self.board_type = None
+
+    def lookup(self, board):
+        # (action, result for the player to move) for a booked position, the
+        # result being None when it is not known. None for other positions.
+        if type(board) is not self.board_type:
+            self.check_game(board)
+        slot = board.zobrist & self.mask
+        while True:
+            zobrist, action, value = SLOT.unpack_from(self.data, HEADER.size + slot * SLOT.size)
+            if value == EMPTY:
+                return None
+            if zobrist == board.zobrist:
+                return action, RESULTS[value]
+            slot = (slot + 1) & self.mask
+
+    def check_game(self, board):
+        # Both games' empty boards hash to 0, so a book for the other game
+        # would answer with one of its moves. Subclasses such as the pygame
+        # boards count as their game.
+        if not any(cls.__name__ == self.game for cls in type(board).__mro__):
+            raise ValueError(f"{self.path}: a {self.game} book cannot answer {type(board).__name__} positions")
+        self.board_type = type(board)
+
+    def __len__(self):
+        return sum(1 for slot in range(self.slots)
+                   if SLOT.unpack_from(self.data, HEADER.size + slot * SLOT.size)[2] != EMPTY)
+
+    def close(self):
+        self.data.close()
+
+    # mmap objects cannot be pickled; a book sent to a worker process reopens its file
+    def __getstate__(self):
+        return self.path, self.verify
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+def write_book(path, game, plies, entries):
+    # entries maps zobrist -> (action, result), result -1, 0, 1 or None
+    slots = 1
+    while slots * MAX_LOAD < len(entries):
+        slots *= 2
+    table = bytearray(slots * SLOT.size)
+    for zobrist, (action, result) in entries.items():
+        slot = zobrist & (slots - 1)
+        while table[slot * SLOT.size + 9] != EMPTY:
+            slot = (slot + 1) & (slots - 1)
+        value = UNKNOWN if result is None else {-1: LOSS, 0: DRAW, 1: WIN}[result]
+        SLOT.pack_into(table, slot * SLOT.size, zobrist, action, value)
+
+    header = HEADER.pack(MAGIC, VERSION, game.encode(), plies, slots, zlib.crc32(table))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # write then rename so a reader never maps a half-written book
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(header)
+        file.write(table)
+    os.replace(temporary, path)
+
+def solve(board, entries):
+    # Negamax over the whole Tic-Tac-Toe game tree, memoized by Zobrist hash.
+    # Scores are for the player to move: wins score higher the sooner they
+    # come and losses the later, so booked moves win fast and hold out longest.
+    if board.is_win():
+        return board.move_count - 10
+    if board.is_draw():
+        return 0
+    known = entries.get(board.zobrist)
+    if known is not None:
+        return known[1]
+    best_action, best_score = None, None
+    for action in board.legal_actions():
+        board.play(action)
+        score = -solve(board, entries)
+        board.undo()
+        if best_score is None or score > best_score:
+            best_action, best_score = action, score
+    entries[board.zobrist] = (best_action, best_score)
+    return best_score
+
+def build_tictactoe(path=TICTACTOE_BOOK):
+    # Every reachable non-terminal position with its perfect-play move
+    scores = {}
+    solve(TicTacToe(), scores)
+    entries = {zobrist: (action, (score > 0) - (score < 0)) for zobrist, (action, score) in scores.items()}
+    write_book(path, 'TicTacToe', 9, entries)
+    return len(entries)
+
+def book_search(board, iterations):
+    # Runs in a worker process: a solver search on one opening position
+    mcts = MCTS(perspective=board.player_1, solver=True, verbose=False)
+    best_move, _ = mcts.search(board, iterations)
+    return best_move.action, mcts.root.proven
+
+def opening_positions(board, plies):
+    # Distinct non-terminal positions less than plies moves after board
+    positions = {board.zobrist: board}
+    frontier = [board]
+    for _ in range(plies - 1):
+        next_frontier = []
+        for position in frontier:
+            if position.is_terminal():
+                continue
+            for action in position.legal_actions():
+                child = position.make_move(action)
+                if child.zobrist not in positions:
+                    positions[child.zobrist] = child
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return [position for position in positions.values() if not position.is_terminal()]
+
+def build_connect4(path=CONNECT4_BOOK, plies=4, iterations=20000, workers=None):
+    # The first plies of Connect Four are too deep to solve here; their moves
+    # come from long solver searches and are only marked solved when proven.
+    # The searches run with the player to move as perspective, so a proven
+    # root value is already the result for that player.
+    positions = opening_positions(ConnectFour(), plies)
+    with ProcessPoolExecutor(workers) as executor:
+        results = executor.map(book_search, positions, [iterations] * len(positions))
+        entries = {position.zobrist: result for position, result in zip(positions, results)}
+    write_book(path, 'ConnectFour', plies, entries)
+    return len(entries)
+
+def load(path, build=None):
+    # The book at path, built first by build(path) if the file is missing.
+    # None when it is missing and there is no builder.
+    if not os.path.exists(path):
+        if build is None:
+            return None
+        build(path)
+    return OpeningBook(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build opening books for the MCTS players.')
+    parser.add_argument('game', choices=('tictactoe', 'connect4'))
+    parser.add_argument('--output', help='book file (default: books/<game>.book)')
+    parser.add_argument('--plies', type=int, default=4, help='Connect Four plies to book')
+    parser.add_argument('--iterations', type=int, default=20000, help='search iterations per Connect Four position')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.game == 'tictactoe':
+        path = args.output or TICTACTOE_BOOK
+        count = build_tictactoe(path)
+    else:
+        path = args.output or CONNECT4_BOOK
+        count = build_connect4(path, args.plies, args.iterations, args.workers)
+    print(f"{count} positions written to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+from mcts import GameState, zobrist_table
+
+COLUMN_COUNT = 7
+ROW_COUNT = 6
+
+# Each column takes ROW_COUNT + 1 bits (bit col * 7 + row, row 0 at the bottom).
+# The extra sentinel bit per column stays empty so shifted lines never wrap.
+COLUMN_HEIGHT = ROW_COUNT + 1
+BOTTOM_BITS = [col * COLUMN_HEIGHT for col in range(COLUMN_COUNT)]
+TOP_BITS = [col * COLUMN_HEIGHT + ROW_COUNT for col in range(COLUMN_COUNT)]
+MAX_MOVES = COLUMN_COUNT * ROW_COUNT
+ZOBRIST = zobrist_table(COLUMN_COUNT * COLUMN_HEIGHT, 'connect4')
+
+def lines_through():
+    # For every cell, the masks of the lines of four a piece dropped there can
+    # complete: horizontal and diagonal lines containing it, and the vertical
+    # line it tops (the cells above a new piece are still empty)
+    lines = [[] for _ in range(COLUMN_COUNT * COLUMN_HEIGHT)]
+    for col in range(COLUMN_COUNT):
+        for row in range(ROW_COUNT):
+            cell = lines[col * COLUMN_HEIGHT + row]
+            if row >= 3:
+                cell.append(sum(1 << (col * COLUMN_HEIGHT + row - i) for i in range(4)))
+            for d_col, d_row in ((1, 0), (1, 1), (1, -1)):
+                for start in range(-3, 1):
+                    squares = [(col + (start + i) * d_col, row + (start + i) * d_row) for i in range(4)]
+                    if all(0 <= c < COLUMN_COUNT and 0 <= r < ROW_COUNT for c, r in squares):
+                        cell.append(sum(1 << (c * COLUMN_HEIGHT + r) for c, r in squares))
+    return lines
+
+LINES_THROUGH = lines_through()
+COLUMN_MASK = (1 << COLUMN_HEIGHT) - 1
+
+class ConnectFour(GameState):
+    __slots__ = ('player_1', 'player_2', 'empty_square', 'bitboards', 'heights', 'moves', 'zobrist', 'won')
+
+    def __init__(self, board=None):
+        self.player_1 = 'HUMAN'
+        self.player_2 = 'AI'
+        self.empty_square = '_'
+        # bitboards[len(moves) & 1] always belongs to the player to move (player_1)
+        self.bitboards = [0, 0]
+        self.heights = list(BOTTOM_BITS)
+        self.moves = []
+        self.zobrist = 0
+        # whether the last move completed a line, set by play()
+        self.won = False
+        if board is not None:
+            self.player_1 = board.player_1
+            self.player_2 = board.player_2
+            self.bitboards = list(board.bitboards)
+            self.heights = list(board.heights)
+            self.moves = list(board.moves)
+            self.zobrist = board.zobrist
+            self.won = board.won
+
+    def can_play(self, col):
+        return self.heights[col] < TOP_BITS[col]
+
+    def play(self, col):
+        side = len(self.moves) & 1
+        cell = self.heights[col]
+        bitboard = self.bitboards[side] | 1 << cell
+        self.bitboards[side] = bitboard
+        self.zobrist ^= ZOBRIST[side][cell]
+        self.heights[col] = cell + 1
+        self.moves.append(col)
+        (self.player_1, self.player_2) = (self.player_2, self.player_1)
+        # only lines through the new piece can have been completed
+        for line in LINES_THROUGH[cell]:
+            if bitboard & line == line:
+                self.won = True
+                break
+
+    def undo(self):
+        col = self.moves.pop()
+        self.heights[col] -= 1
+        side = len(self.moves) & 1
+        self.bitboards[side] ^= 1 << self.heights[col]
+        self.zobrist ^= ZOBRIST[side][self.heights[col]]
+        (self.player_1, self.player_2) = (self.player_2, self.player_1)
+        # play() stops at a win, so the position before the last move had none
+        self.won = False
+        return col
+
+    def apply(self, col):
+        self.play(col)
+
+    def make_move(self, col):
+        board = self.__class__(self)
+        board.play(col)
+        return board
+
+    def is_draw(self):
+        return len(self.moves) == MAX_MOVES
+
+    def is_win(self):
+        # player_2 made the last move, play() checked it
+        return self.won
+
+    def key(self):
+        return self.bitboards[0] | self.bitboards[1] << (COLUMN_COUNT * COLUMN_HEIGHT)
+
+    def ply(self):
+        return len(self.moves)
+
+    def canonical_key(self):
+        # the smaller key() of the position and its left-right mirror image
+        key = self.key()
+        mirror = 0
+        for col in range(COLUMN_COUNT):
+            mirror |= (key >> col * COLUMN_HEIGHT & COLUMN_MASK) << (COLUMN_COUNT - 1 - col) * COLUMN_HEIGHT
+            mirror |= ((key >> (COLUMN_COUNT + col) * COLUMN_HEIGHT & COLUMN_MASK)
+                       << (2 * COLUMN_COUNT - 1 - col) * COLUMN_HEIGHT)
+        return min(key, mirror)
+
+    def legal_actions(self):
+        heights = self.heights
+        return [col for col in range(COLUMN_COUNT) if heights[col] < TOP_BITS[col]]
+
+    @property
+    def position(self):
+        to_move = self.bitboards[len(self.moves) & 1]
+        last_moved = self.bitboards[(len(self.moves) + 1) & 1]
+        position = [[self.empty_square for _ in range(COLUMN_COUNT)] for _ in range(ROW_COUNT)]
+        for col in range(COLUMN_COUNT):
+            for row in range(ROW_COUNT):
+                bit = 1 << (col * COLUMN_HEIGHT + row)
+                if to_move & bit:
+                    position[ROW_COUNT - 1 - row][col] = self.player_1
+                elif last_moved & bit:
+                    position[ROW_COUNT - 1 - row][col] = self.player_2
+        return position
+
+    def __str__(self):
+        board_string = ''
+        for row in self.position:
+            board_string += ' ' + ' '.join(square[0] for square in row) + '\n'
+        return board_string
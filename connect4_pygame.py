@@ -1,10 +1,16 @@
 import pygame
 import sys
-from copy import deepcopy
 import time
 from mcts import *
-
-MAX_ITER = 1000
+from connect4 import ConnectFour as ConnectFourBoard, COLUMN_COUNT, ROW_COUNT
+from background import BackgroundSearch
+from renderer import Renderer
+import book
+from stats_store import StatsStore
+
+MAX_ITER = 50000
+PONDER_MAX_ITER = 100000
+TIME_BUDGET_MS = 1000
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 600
 LINE_COLOR = (0, 0, 0)
@@ -13,160 +19,124 @@ PLAYER_HUMAN_COLOR = (255, 0, 0)
 PLAYER_AI_COLOR = (0, 0, 255)
 FONT_COLOR = (0, 0, 0)
 FONT_SIZE = 50
+SMALL_FONT_SIZE = 20
+STATS_PATH = 'connect4_stats.sqlite'
 BUTTON_COLOR = (100, 100, 100)
 BUTTON_FONT_COLOR = (255, 255, 255)
 BUTTON_FONT_SIZE = 20
 BUTTON_WIDTH = 100
 BUTTON_HEIGHT = 50
-COLUMN_COUNT = 7
-ROW_COUNT = 6
-
-class ConnectFour():
-    def __init__(self, board=None):
-        self.player_1 = 'HUMAN'
-        self.player_2 = 'AI'
-        self.empty_square = '_'
-        self.position = [['_' for _ in range(7)] for _ in range(6)]
-        if board is not None:
-            self.__dict__ = deepcopy(board.__dict__)
-
-    def make_move(self, col):
-        board = ConnectFour(self)
-        for row in range(5, -1, -1):
-            if board.position[row][col] == '_':
-                board.position[row][col] = self.player_1
-                (board.player_1, board.player_2) = (board.player_2, board.player_1)
-                break
-        return board
-
-    def is_draw(self):
-        for row in self.position:
-            if '_' in row:
-                return False
-        return True
-    
-    def is_win(self):
-        # Check horizontal locations for win
-        for c in range(COLUMN_COUNT-3):
-            for r in range(ROW_COUNT):
-                if self.position[r][c] == self.player_2 and self.position[r][c+1] == self.player_2 \
-                    and self.position[r][c+2] == self.player_2 and self.position[r][c+3] == self.player_2:
-                    return True
-
-        # Check vertical locations for win
-        for c in range(COLUMN_COUNT):
-            for r in range(ROW_COUNT-3):
-                if self.position[r][c] == self.player_2 and self.position[r+1][c] == self.player_2 \
-                    and self.position[r+2][c] == self.player_2 and self.position[r+3][c] == self.player_2:
-                    return True
-
-        # Check positively sloped diaganols
-        for c in range(COLUMN_COUNT-3):
-            for r in range(ROW_COUNT-3):
-                if self.position[r][c] == self.player_2 and self.position[r+1][c+1] == self.player_2 \
-                    and self.position[r+2][c+2] == self.player_2 and self.position[r+3][c+3] == self.player_2:
-                    return True
-
-        # Check negatively sloped diaganols
-        for c in range(COLUMN_COUNT-3):
-            for r in range(3, ROW_COUNT):
-                if self.position[r][c] == self.player_2 and self.position[r-1][c+1] == self.player_2 \
-                    and self.position[r-2][c+2] == self.player_2 and self.position[r-3][c+3] == self.player_2:
-                    return True
-
-    def legal_moves(self):
-        actions = []
-        for col in range(7):
-            if self.position[0][col] == '_':
-                actions.append(self.make_move(col))        
-        
-        return actions
 
+class ConnectFour(ConnectFourBoard):
     def game_loop(self):
         pygame.init()
         screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Connect Four")
         font = pygame.font.SysFont(None, FONT_SIZE)
+        small_font = pygame.font.SysFont(None, SMALL_FONT_SIZE)
         button_font = pygame.font.SysFont(None, BUTTON_FONT_SIZE)
         clock = pygame.time.Clock()
+        renderer = Renderer(screen, self.draw_background(screen))
 
-        self.draw_board(screen, font)
-        pygame.display.flip()
+        self.draw_board(renderer, font, small_font)
+        renderer.present()
         clock.tick(30)
 
-        mcts = MCTS()
+        # built offline with python book.py connect4, None when there is none
+        opening_book = book.load(book.CONNECT4_BOOK)
+        # statistics from earlier games, written back when the search is closed
+        store = StatsStore(STATS_PATH)
+        search = BackgroundSearch(early_stop=True, solver=True, symmetry_depth=2, book=opening_book, store=store)
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    search.close()
                     pygame.quit()
                     sys.exit()
 
-                if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.type == pygame.MOUSEBUTTONDOWN and not search.running:
                     pos = pygame.mouse.get_pos()
                     col = pos[0] // (SCREEN_WIDTH // 7)
 
-                    if self.position[0][col] != '_':
+                    if not self.can_play(col):
                         continue
 
                     self = self.make_move(col)
+                    search.advance(col)
 
-                    self.draw_board(screen, font)
-                    pygame.display.flip()
-                    clock.tick(30)
+                    self.draw_board(renderer, font, small_font)
+                    renderer.present()
 
                     if self.is_win():
                         winning_combination = self.get_winning_combination()
-                        self.draw_connecting_line(screen, winning_combination) 
+                        self.draw_connecting_line(renderer, winning_combination) 
                         time.sleep(5)                    
+                        search.close()
                         self.end_game_screen(screen, font, button_font, "Human has won!")
                         return
                     elif self.is_draw():
+                        search.close()
                         self.end_game_screen(screen, font, button_font, "Game is drawn!")
                         return
 
-                    best_move, _ = mcts.search(self, MAX_ITER)
-
-                    pygame.display.flip()
-                    clock.tick(30)
-
-                    try:
-                        self = best_move.board
-                        self.draw_board(screen, font)
-                        pygame.display.flip()
-                        clock.tick(30)
-
-                        if self.is_win():
-                            winning_combination = self.get_winning_combination()
-                            self.draw_connecting_line(screen, winning_combination) 
-                            time.sleep(4)  
-                            self.end_game_screen(screen, font, button_font, "Machine has won!")
-                            return
-                        elif self.is_draw():
-                            self.end_game_screen(screen, font, button_font, "Game is drawn!")
-                            return
-                    except:
-                        pass
-
-    def draw_board(self, screen, font):
-        screen.fill(BG_COLOR)
-        for i in range(1, 7):
-            pygame.draw.line(screen, LINE_COLOR, (0, i * SCREEN_HEIGHT // 6), (SCREEN_WIDTH, i * SCREEN_HEIGHT // 6), 3)
-            pygame.draw.line(screen, LINE_COLOR, (i * SCREEN_WIDTH // 7, 0), (i * SCREEN_WIDTH // 7, SCREEN_HEIGHT), 3)
+                    search.start(self, MAX_ITER, TIME_BUDGET_MS, count_existing=True)
 
-        for row in range(6):
-            for col in range(7):
-                x = col * (SCREEN_WIDTH // 7) + (SCREEN_WIDTH // 7) // 2
-                y = row * (SCREEN_HEIGHT // 6) + (SCREEN_HEIGHT // 6) // 2
-
-                if self.position[row][col] == 'HUMAN':
-                    text = font.render('O', True, PLAYER_HUMAN_COLOR)
-                elif self.position[row][col] == 'AI':
-                    text = font.render('O', True, PLAYER_AI_COLOR)
+            if search.running:
+                result = search.poll()
+                if result is None:
+                    self.draw_board(renderer, font, small_font, search.live_children())
+                    renderer.present()
                 else:
-                    continue
+                    best_move, _ = result
+                    self = best_move.board
+                    search.advance(best_move.action)
+                    self.draw_board(renderer, font, small_font)
+                    renderer.present()
 
-                text_rect = text.get_rect(center=(x, y))
-                screen.blit(text, text_rect)
+                    if self.is_win():
+                        winning_combination = self.get_winning_combination()
+                        self.draw_connecting_line(renderer, winning_combination) 
+                        time.sleep(4)  
+                        search.close()
+                        self.end_game_screen(screen, font, button_font, "Machine has won!")
+                        return
+                    elif self.is_draw():
+                        search.close()
+                        self.end_game_screen(screen, font, button_font, "Game is drawn!")
+                        return
+                    search.ponder(self, PONDER_MAX_ITER)
+            clock.tick(30)
+
+    def draw_background(self, screen):
+        background = pygame.Surface(screen.get_size())
+        background.fill(BG_COLOR)
+        for i in range(1, 7):
+            pygame.draw.line(background, LINE_COLOR, (0, i * SCREEN_HEIGHT // 6), (SCREEN_WIDTH, i * SCREEN_HEIGHT // 6), 3)
+            pygame.draw.line(background, LINE_COLOR, (i * SCREEN_WIDTH // 7, 0), (i * SCREEN_WIDTH // 7, SCREEN_HEIGHT), 3)
+        return background
+
+    def draw_board(self, renderer, font, small_font, children=None):
+        # Discs, plus the live visit counts of a running search above each
+        # candidate column (children keyed by column) in the top row's cells
+        children = children or {}
+        cell_width = SCREEN_WIDTH // 7
+        cell_height = SCREEN_HEIGHT // 6
+        position = self.position
+        for row in range(6):
+            for col in range(7):
+                x = col * cell_width + cell_width // 2
+                y = row * cell_height + cell_height // 2
+                # keep clear of the grid lines
+                rect = pygame.Rect(col * cell_width, row * cell_height, cell_width, cell_height).inflate(-6, -6)
+
+                items = ()
+                if position[row][col] == 'HUMAN':
+                    items = ((font, 'O', PLAYER_HUMAN_COLOR, (x, y)),)
+                elif position[row][col] == 'AI':
+                    items = ((font, 'O', PLAYER_AI_COLOR, (x, y)),)
+                if row == 0 and col in children:
+                    items += ((small_font, f'{children[col].visits}', FONT_COLOR, (x, SMALL_FONT_SIZE // 2)),)
+                renderer.draw_cell((row, col), rect, items)
 
     def end_game_screen(self, screen, font, button_font, message):
         screen.fill(BG_COLOR)
@@ -232,15 +202,15 @@ class ConnectFour():
                     and self.position[r-2][c+2] == self.player_2 and self.position[r-3][c+3] == self.player_2:
                     return [(r, c), (r-1, c+1), (r-2, c+2), (r-3, c+3)]
 
-    def draw_connecting_line(self, screen, winning_combination):
+    def draw_connecting_line(self, renderer, winning_combination):
         start_row, start_col = winning_combination[0]
         end_row, end_col = winning_combination[-1]
         start_x = start_col * (SCREEN_WIDTH // 7) + (SCREEN_WIDTH // 7) // 2
         start_y = start_row * (SCREEN_HEIGHT // 6) + (SCREEN_HEIGHT // 6) // 2
         end_x = end_col * (SCREEN_WIDTH // 7) + (SCREEN_WIDTH // 7) // 2
         end_y = end_row * (SCREEN_HEIGHT // 6) + (SCREEN_HEIGHT // 6) // 2
-        pygame.draw.line(screen, LINE_COLOR, (start_x, start_y), (end_x, end_y), 5)
-        pygame.display.flip()
+        renderer.draw_line(LINE_COLOR, (start_x, start_y), (end_x, end_y), 5)
+        renderer.present()
 
 if __name__ == '__main__':
     board = ConnectFour()
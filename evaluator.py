@@ -0,0 +1,194 @@
+import math
+import random
+import numpy as np
+from connect4 import COLUMN_COUNT, COLUMN_HEIGHT, ROW_COUNT, BOTTOM_BITS
+from mcts import MCTS
+from rollout_policies import BOARD_MASK, BOTTOM_MASK, CENTER_WEIGHTS, winning_cells
+
+# An evaluator estimates leaves instead of playing them out. It is called with
+# a list of non-terminal boards and returns (values, priors): values[i] in
+# [-1, 1] for the player to move at boards[i], and priors either None or an
+# array with one row of move probabilities per board, indexed by action.
+
+def connect_four_windows():
+    # mask of every line of four on the board
+    windows = []
+    for col in range(COLUMN_COUNT):
+        for row in range(ROW_COUNT):
+            for d_col, d_row in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                squares = [(col + i * d_col, row + i * d_row) for i in range(4)]
+                if all(0 <= c < COLUMN_COUNT and 0 <= r < ROW_COUNT for c, r in squares):
+                    windows.append(sum(1 << (c * COLUMN_HEIGHT + r) for c, r in squares))
+    return np.array(windows, dtype=np.uint64)
+
+WINDOWS = connect_four_windows()
+COLUMN_MASKS = np.array([((1 << COLUMN_HEIGHT) - 1) << bit for bit in BOTTOM_BITS], dtype=np.uint64)
+CENTER_LOGITS = np.log(np.array(CENTER_WEIGHTS, dtype=np.float64))
+POPCOUNT_16 = np.array([bin(value).count('1') for value in range(1 << 16)], dtype=np.uint8)
+
+def table_popcount(values):
+    # set bits of each uint64, summed over its four 16-bit pieces
+    counts = np.zeros(values.shape, dtype=np.uint8)
+    for shift in (0, 16, 32, 48):
+        counts += POPCOUNT_16[(values >> np.uint64(shift)) & np.uint64(0xFFFF)]
+    return counts
+
+# np.bitwise_count needs NumPy 2.0
+popcount = getattr(np, 'bitwise_count', table_popcount)
+
+class ThreatEvaluator():
+    # Linear threat-count model for Connect Four. A window (line of four)
+    # holding k pieces of one side and none of the other counts weights[k - 1]
+    # for that side; the value is tanh of the mover's total minus the
+    # opponent's. A playable winning cell is a win for the mover, two playable
+    # winning cells of the opponent a loss. Priors favour winning, blocking and
+    # centre moves and avoid filling the cell under an opponent's winning cell.
+    # The whole batch is a few NumPy operations on (boards, windows) arrays.
+    def __init__(self, weights=(0.02, 0.1, 0.4), win_logit=6.0, block_logit=4.0, unsafe_logit=-3.0):
+        self.weights = np.array((0.0,) + tuple(weights) + (0.0,))
+        self.win_logit = win_logit
+        self.block_logit = block_logit
+        self.unsafe_logit = unsafe_logit
+
+    def __call__(self, boards):
+        sides = [len(board.moves) & 1 for board in boards]
+        mover = np.array([board.bitboards[side] for board, side in zip(boards, sides)], dtype=np.uint64)
+        opponent = np.array([board.bitboards[side ^ 1] for board, side in zip(boards, sides)], dtype=np.uint64)
+        occupied = mover | opponent
+        playable = (occupied + np.uint64(BOTTOM_MASK)) & np.uint64(BOARD_MASK)
+
+        own = popcount(mover[:, None] & WINDOWS)
+        other = popcount(opponent[:, None] & WINDOWS)
+        weights = self.weights
+        score = (weights[own] * (other == 0)).sum(axis=1) - (weights[other] * (own == 0)).sum(axis=1)
+        values = np.tanh(score)
+
+        wins = winning_cells(mover, occupied) & playable
+        threats = winning_cells(opponent, occupied)
+        blocks = threats & playable
+        values[popcount(blocks) > 1] = -1.0
+        values[wins != 0] = 1.0
+
+        # one playable cell per open column
+        cells = playable[:, None] & COLUMN_MASKS
+        logits = np.broadcast_to(CENTER_LOGITS, cells.shape).copy()
+        logits[(cells & wins[:, None]) != 0] += self.win_logit
+        logits[(cells & blocks[:, None]) != 0] += self.block_logit
+        logits[(cells & (threats[:, None] >> np.uint64(1))) != 0] += self.unsafe_logit
+        logits[cells == 0] = -np.inf
+        priors = np.exp(logits - logits.max(axis=1, keepdims=True))
+        priors /= priors.sum(axis=1, keepdims=True)
+        return values, priors
+
+class EvaluatorMCTS(MCTS):
+    # MCTS with leaves estimated by evaluator(boards) rather than rollouts.
+    # Every iteration selects batch_size leaves, each under a virtual loss so
+    # that the next selection takes another path, queues them and evaluates
+    # the queue in one vectorized call, which amortizes the per-call Python
+    # overhead. An iteration thus adds batch_size visits, as an iteration with
+    # a batched simulator adds playouts. Terminal and proven leaves are scored
+    # on the spot. With priors, children are expanded best prior first and
+    # selected by PUCT:
+    #   Q + exploration * prior * sqrt(parent visits) / (1 + child visits)
+    # The clock is read every CHECK_INTERVAL iterations, so large batches
+    # overshoot tight time budgets by more.
+    def __init__(self, evaluator, batch_size=8, virtual_loss=1, **options):
+        super().__init__(**options)
+        if self.simulator is not None or self.policy is not None:
+            raise ValueError("EvaluatorMCTS estimates leaves with its evaluator, it plays no rollouts")
+        self.evaluator = evaluator
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.playouts = batch_size
+        self.pending = []
+
+    def set_root(self, initial_state):
+        super().set_root(initial_state)
+        # the root is never queued, its priors are asked for here
+        root = self.root
+        if root.priors is None and not root.is_terminal:
+            _, priors = self.evaluator([root.board])
+            if priors is not None:
+                self.set_priors(root, priors[0])
+
+    def iterate(self):
+        self.pending = pending = []
+        for _ in range(self.batch_size):
+            if self.root.proven is not None:
+                break
+            node = self.select(self.root)
+            if node.proven is not None:
+                score = node.proven
+            elif node.is_terminal:
+                score = node.board.result(self.perspective)
+            else:
+                self.add_virtual_loss(self.path, self.virtual_loss)
+                pending.append((node, self.path))
+                continue
+            self.backpropagate(node, score, 1)
+            if node.proven is not None:
+                self.propagate_proof()
+        if pending:
+            self.evaluate(pending)
+        self.pending = []
+
+    def evaluate(self, pending):
+        values, priors = self.evaluator([node.board for node, _ in pending])
+        for index, (node, path) in enumerate(pending):
+            self.add_virtual_loss(path, -self.virtual_loss)
+            value = float(values[index])
+            if priors is not None and node.priors is None:
+                self.set_priors(node, priors[index])
+            self.path = path
+            self.backpropagate(node, value if node.board.player_1 == self.perspective else -value, 1)
+
+    def in_use(self):
+        # queued leaves hold a virtual loss, they are kept until evaluated
+        nodes = list(super().in_use())
+        for _, path in self.pending:
+            nodes.extend(path)
+        return nodes
+
+    def add_virtual_loss(self, path, loss):
+        # counts loss lost visits for the movers along path (negative to take them back)
+        parent = None
+        for node in path:
+            node.visits += loss
+            node.score += -loss if node.player == self.perspective else loss
+            if parent is not None and self.transpositions is not None:
+                if parent.edge_visits is None:
+                    parent.edge_visits = {}
+                parent.edge_visits[node] = parent.edge_visits.get(node, 0) + loss
+            parent = node
+
+    def set_priors(self, node, row):
+        node.priors = {action: float(row[action]) for action in node.board.legal_actions()}
+        # expand() pops from the end
+        node.untried_actions.sort(key=node.priors.get)
+
+    def get_best_move(self, node, exploration_constant):
+        priors = node.priors
+        if not exploration_constant or priors is None:
+            return super().get_best_move(node, exploration_constant)
+        best_score = float('-inf')
+        best_moves = []
+        current_player = 1 if node.board.player_1 == self.perspective else -1
+        sqrt_visits = math.sqrt(node.visits)
+        edge_visits = node.edge_visits
+
+        for action, child_node in node.children.items():
+            if child_node.proven is not None:
+                continue
+            visits = child_node.visits if edge_visits is None else edge_visits[child_node]
+            exploration = exploration_constant * priors.get(action, 0) * sqrt_visits / (1 + visits)
+            move_score = current_player * child_node.score / child_node.visits + exploration
+            child_node.uct = move_score
+
+            if move_score > best_score:
+                best_score = move_score
+                best_moves = [child_node]
+            elif move_score == best_score:
+                best_moves.append(child_node)
+        if not best_moves:
+            return None
+        return random.choice(best_moves)
@@ -0,0 +1,143 @@
+import json
+import sys
+import time
+from collections import Counter
+
+# Search phases timed by SearchStats, as MCTS method name -> reported phase.
+# Times are exclusive: expand() runs inside select() and is not counted twice.
+PHASES = {'select': 'select', 'expand': 'expand', 'simulate': 'rollout', 'backpropagate': 'backpropagate'}
+
+class SearchStats():
+    # Per-phase times and counts for one MCTS instance. attach() replaces the
+    # instance's phase methods with timing wrappers, so the methods of a
+    # search created without stats are untouched and cost nothing extra.
+    #
+    # Besides the phase times it records iterations, expansions, the depth of
+    # every selected leaf, playout lengths (scalar rollouts only) and the net
+    # number of memory blocks allocated per iteration. Thread-parallel
+    # searches would interleave the timers, attach it to one thread's search.
+    def __init__(self):
+        self.mcts = None
+        self.reset()
+
+    def reset(self):
+        self.seconds = dict.fromkeys(PHASES.values(), 0.0)
+        self.calls = dict.fromkeys(PHASES.values(), 0)
+        self.iterations = 0
+        self.depths = Counter()
+        self.playouts = 0
+        self.playout_moves = 0
+        self.allocated_blocks = 0
+        # time of the phases running inside the current one
+        self.nested = 0.0
+
+    def attach(self, mcts):
+        self.mcts = mcts
+        for method, phase in PHASES.items():
+            setattr(mcts, method, self.timed(phase, getattr(mcts, method)))
+        mcts.iterate = self.counted(mcts.iterate)
+        mcts.playout = self.measured(mcts.playout)
+
+    def timed(self, phase, method):
+        def timed_method(*args):
+            start = time.perf_counter()
+            outer, self.nested = self.nested, 0.0
+            try:
+                return method(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.seconds[phase] += elapsed - self.nested
+                self.calls[phase] += 1
+                self.nested = outer + elapsed
+        return timed_method
+
+    def counted(self, iterate):
+        def counted_iterate():
+            blocks = sys.getallocatedblocks()
+            iterate()
+            self.allocated_blocks += sys.getallocatedblocks() - blocks
+            self.iterations += 1
+            # ArrayMCTS keeps no path, its depths are not recorded
+            path = getattr(self.mcts, 'path', None)
+            if path is not None:
+                self.depths[len(path) - 1] += 1
+        return counted_iterate
+
+    def measured(self, playout):
+        def measured_playout(board):
+            end = playout(board)
+            self.playouts += 1
+            self.playout_moves += end.ply() - board.ply()
+            return end
+        return measured_playout
+
+    def tree_size(self):
+        # Nodes reachable from the current root, shared nodes counted once
+        root = getattr(self.mcts, 'root', None)
+        if root is None:
+            return 0
+        seen = {id(root)}
+        stack = [root]
+        while stack:
+            for child in stack.pop().children.values():
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return len(seen)
+
+    def as_dict(self):
+        iterations = self.iterations or 1
+        depth_count = sum(self.depths.values())
+        return {
+            'iterations': self.iterations,
+            'seconds': dict(self.seconds),
+            'calls': dict(self.calls),
+            'expansions': self.calls['expand'],
+            'tree_size': self.tree_size(),
+            'depth_histogram': {depth: self.depths[depth] for depth in sorted(self.depths)},
+            'mean_depth': sum(depth * count for depth, count in self.depths.items()) / depth_count
+                          if depth_count else 0,
+            'playouts': self.playouts,
+            'mean_playout_length': self.playout_moves / self.playouts if self.playouts else 0,
+            'allocated_blocks_per_iteration': self.allocated_blocks / iterations,
+            'recycled_nodes': getattr(self.mcts, 'recycled_nodes', 0),
+            'recycle_passes': getattr(self.mcts, 'recycle_passes', 0),
+        }
+
+    def to_json(self, **options):
+        return json.dumps(self.as_dict(), **options)
+
+    def to_prometheus(self, prefix='mcts'):
+        # Prometheus text exposition format
+        stats = self.as_dict()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric('phase_seconds_total', 'counter', 'Time spent in each search phase.',
+               [(f'{{phase="{phase}"}}', seconds) for phase, seconds in stats['seconds'].items()])
+        metric('phase_calls_total', 'counter', 'Calls of each search phase.',
+               [(f'{{phase="{phase}"}}', calls) for phase, calls in stats['calls'].items()])
+        metric('iterations_total', 'counter', 'Search iterations.', [('', stats['iterations'])])
+        metric('tree_nodes', 'gauge', 'Nodes reachable from the root.', [('', stats['tree_size'])])
+        metric('playouts_total', 'counter', 'Scalar playouts.', [('', self.playouts)])
+        metric('playout_moves_total', 'counter', 'Moves played in scalar playouts.', [('', self.playout_moves)])
+        metric('recycled_nodes_total', 'counter', 'Nodes dropped to stay within the node budget.',
+               [('', stats['recycled_nodes'])])
+        metric('allocated_blocks_total', 'counter', 'Net memory blocks allocated by iterations.',
+               [('', self.allocated_blocks)])
+
+        buckets = []
+        cumulative = 0
+        for depth in sorted(self.depths):
+            cumulative += self.depths[depth]
+            buckets.append((f'_bucket{{le="{depth}"}}', cumulative))
+        buckets.append(('_bucket{le="+Inf"}', cumulative))
+        buckets.append(('_sum', sum(depth * count for depth, count in self.depths.items())))
+        buckets.append(('_count', cumulative))
+        metric('selection_depth', 'histogram', 'Depth of the leaf reached by each selection.', buckets)
+        return '\n'.join(lines) + '\n'
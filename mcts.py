@@ -1,82 +1,573 @@
+import copy
 import math
 import random
+import sys
 import time
 
+# How many iterations run between clock / early stop checks
+CHECK_INTERVAL = 16
+# Share of the node budget freed by each recycling pass
+RECYCLE_FRACTION = 0.25
+
+def zobrist_table(cells, seed):
+    # One random 64-bit key per (side, cell), seeded so hashes are stable across runs
+    generator = random.Random(seed)
+    return [[generator.getrandbits(64) for _ in range(cells)] for _ in range(2)]
+
+class GameState():
+    # Interface the search runs over. apply() mutates the state in place,
+    # copy() is only needed when a node has to keep its own board. States also
+    # carry a zobrist attribute: a 64-bit hash of the position kept up to date
+    # by apply().
+    __slots__ = ()
+
+    def legal_actions(self):
+        raise NotImplementedError
+
+    def apply(self, action):
+        raise NotImplementedError
+
+    def undo(self):
+        # takes back the last apply() and returns its action
+        raise NotImplementedError
+
+    def key(self):
+        raise NotImplementedError
+
+    def ply(self):
+        # number of moves played so far
+        raise NotImplementedError
+
+    def canonical_key(self):
+        # the same for every position equivalent to this one under the
+        # board's symmetries; without symmetries just key()
+        return self.key()
+
+    def copy(self):
+        return self.__class__(self)
+
+    def is_terminal(self):
+        return self.is_win() or self.is_draw()
+
+    def result(self, perspective):
+        # player_2 made the last move, so it is the only one who can have won
+        if self.is_win():
+            return 1 if self.player_2 == perspective else -1
+        return 0
+
+def node_bytes(node):
+    # Rough size of a node with its own board and containers, used to turn
+    # max_bytes into a node budget
+    board = node.board
+    size = sum(sys.getsizeof(value) for value in
+               (node, node.__dict__, board, node.untried_actions, node.children))
+    for name in board.__slots__:
+        value = getattr(board, name)
+        if isinstance(value, list):
+            size += sys.getsizeof(value)
+    return size
+
 class Node():
-    def __init__(self, board, parent):
+    def __init__(self, board, parent, action=None):
         self.board = board
-        if self.board.is_win() or self.board.is_draw():
-            self.is_terminal = True
-        else:
-            self.is_terminal = False
+        self.action = action
+        self.player = board.player_2
+        self.is_terminal = board.is_terminal()
+        self.untried_actions = [] if self.is_terminal else board.legal_actions()
         self.is_fully_expanded = self.is_terminal
         self.parent = parent
         self.visits = 0
         self.score = 0
         self.uct = 0
         self.children = {}
+        # per-child selection counts, only kept when the tree is a DAG
+        self.edge_visits = None
+        # {action: [visits, score]} all-moves-as-first statistics, only kept by rave.RaveMCTS
+        self.amaf = None
+        # {action: probability} from an evaluator's priors, only kept by evaluator.EvaluatorMCTS
+        self.priors = None
+        # {action: [symmetric actions]} for the moves left out of
+        # untried_actions because they lead to a mirror image of action's position
+        self.equivalent_actions = None
+        # game-theoretic value (perspective score 1, 0 or -1) once the solver
+        # has proven it, None while unknown
+        self.proven = None
+        # {action: (visits, score, proven)} kept for the children recycled
+        # to stay within the node budget, restored when they are expanded again
+        self.recycled = None
 
 class MCTS():
-    def search(self, initial_state, max_iterations=1000):
-        self.root = Node(initial_state, None)
+    def __init__(self, perspective='HUMAN', exploration=2, playouts=1, simulator=None, policy=None, transpositions=None,
+                 early_stop=False, solver=False, symmetry_depth=0, max_nodes=None, max_bytes=None, book=None, store=None,
+                 stats=None, verbose=True):
+        self.perspective = perspective
+        self.verbose = verbose
+        # UCT exploration constant used during selection
+        self.exploration = exploration
+        # MCTS-Solver: propagate proven wins, losses and draws up the tree,
+        # never select proven subtrees and stop as soon as the root is solved
+        self.solver = solver
+        # nodes fewer than symmetry_depth plies below the root expand one move
+        # per set of moves leading to symmetric positions
+        self.symmetry_depth = symmetry_depth
+        # stop once the most visited root child can no longer be overtaken
+        # within the remaining budget; that child is then the move returned
+        self.early_stop = early_stop
+        # optional transposition.TranspositionTable; with one the tree becomes
+        # a DAG and backpropagation follows the path taken by select()
+        self.transpositions = transpositions
+        # Bound the tree to max_nodes nodes, or to about max_bytes (estimated
+        # from the size of the root). When it is full, the least-visited
+        # subtrees below the root's children are dropped: their parent keeps
+        # their statistics and gets the move back as untried. recycled_nodes
+        # counts the nodes dropped, recycle_passes the times it happened.
+        if (max_nodes is not None or max_bytes is not None) and transpositions is not None:
+            raise ValueError("a transposition table is bounded by its own max_size, not by max_nodes / max_bytes")
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.node_budget = None
+        self.node_count = 0
+        self.recycled_nodes = 0
+        self.recycle_passes = 0
+        # simulator(board, playouts, perspective) returns an array of playout
+        # results, e.g. batch_rollout.playouts; without one each leaf gets a
+        # single rollout()
+        self.playouts = playouts
+        self.simulator = simulator
+        # optional policy(board) picking the moves of scalar playouts, e.g.
+        # rollout_policies.tactical; uniform random moves without one
+        self.policy = policy
+        # optional book.OpeningBook; booked positions are answered from it
+        # without searching
+        self.book = book
+        # optional stats_store.StatsStore; new nodes start from the statistics
+        # it kept from earlier games, and every search adds to it
+        self.store = store
+        self.root = None
+        # optional instrumentation.SearchStats; it wraps this instance's
+        # methods, so a search without one runs the plain methods
+        self.stats = stats
+        if stats is not None:
+            stats.attach(self)
+        # optional on_check(iterations) called at every check point of run();
+        # returning True stops the search
+        self.on_check = None
+
+    def search(self, initial_state, max_iterations=1000, time_budget_ms=None):
+        # max_iterations may be None when a time budget is given
+        self.set_root(initial_state)
+        booked = self.book_move(initial_state)
+        if booked is not None:
+            return booked
 
         start_time = time.time()
-        for _ in range(max_iterations):
-            node = self.select(self.root)
-            score = self.rollout(node.board)
-            self.backpropagate(node, score)
+        self.run(max_iterations, time_budget_ms)
 
-        best_move = self.get_best_move(self.root, 0)
-        children = self.root.children
+        best_move = self.choose_move(self.root)
+        children = self.root_children()
 
-        print(f"Time taken: {time.time() - start_time}")
+        if self.verbose:
+            print(f"Time taken: {time.time() - start_time}")
         return best_move, children
-    
+
+    def root_children(self):
+        # The root's children by action, with the moves collapsed by symmetry
+        # sharing the statistics of the move they were collapsed into
+        root = self.root
+        if root.equivalent_actions is None:
+            return root.children
+        children = dict(root.children)
+        for action, equivalents in root.equivalent_actions.items():
+            child = root.children.get(action)
+            if child is None:
+                continue
+            for equivalent in equivalents:
+                board = root.board.copy()
+                board.apply(equivalent)
+                mirror = Node(board, root, equivalent)
+                mirror.visits, mirror.score, mirror.uct = child.visits, child.score, child.uct
+                mirror.proven = child.proven
+                children[equivalent] = mirror
+        return children
+
+    def book_stats(self, initial_state):
+        # {action: (1, score, None)} for the book move of a booked position, None otherwise
+        entry = None if self.book is None else self.book.lookup(initial_state)
+        if entry is None:
+            return None
+        action, result = entry
+        sign = 1 if initial_state.player_1 == self.perspective else -1
+        return {action: (1, 0 if result is None else sign * result, None)}
+
+    def book_move(self, initial_state):
+        stats = self.book_stats(initial_state)
+        if stats is None:
+            return None
+        root = self.build_root(initial_state, stats)
+        (best_move,) = root.children.values()
+        return best_move, root.children
+
+    def run(self, max_iterations, time_budget_ms=None):
+        start = time.monotonic()
+        deadline = None if time_budget_ms is None else start + time_budget_ms / 1000
+        iterations = 0
+        while max_iterations is None or iterations < max_iterations:
+            if self.solver and self.root.proven is not None:
+                break
+            self.iterate()
+            iterations += 1
+            if iterations % CHECK_INTERVAL:
+                continue
+            if self.on_check is not None and self.on_check(iterations):
+                break
+            if deadline is None and not self.early_stop:
+                continue
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            if self.early_stop:
+                remaining = float('inf')
+                if max_iterations is not None:
+                    remaining = max_iterations - iterations
+                # coarse clocks (about 15.6 ms on older Windows Pythons) may not
+                # have ticked yet, leaving no rate to project from
+                if deadline is not None and now > start:
+                    remaining = min(remaining, iterations * (deadline - now) / (now - start))
+                if self.is_decided(remaining * self.playouts):
+                    break
+        self.iterations = iterations
+        if self.store is not None:
+            self.store.collect(self.root, self.perspective)
+        return iterations
+
+    def iterate(self):
+        node = self.select(self.root)
+        if node.proven is None:
+            score, visits = self.simulate(node.board)
+        else:
+            score, visits = node.proven * self.playouts, self.playouts
+        self.backpropagate(node, score, visits)
+        if node.proven is not None:
+            self.propagate_proof()
+
+    def root_child_visits(self):
+        # unexpanded root moves count as unvisited children
+        visits = [child.visits for child in self.root.children.values()]
+        return visits + [0] * len(self.root.untried_actions)
+
+    def is_decided(self, remaining_visits):
+        visits = sorted(self.root_child_visits(), reverse=True)
+        return len(visits) < 2 or visits[0] - visits[1] > remaining_visits
+
+    def choose_move(self, root):
+        best_move = self.get_best_move(root, 0)
+        if root.proven is not None:
+            # a solved root: play a move that achieves its value
+            solved = [child for child in root.children.values() if child.proven == root.proven]
+            best_move = max(solved, key=lambda child: child.visits)
+        elif self.early_stop:
+            best_move = max(root.children.values(), key=lambda child: child.visits)
+        if self.transpositions is not None:
+            # a shared node keeps the action of the parent that created it, the
+            # move played from root is the key it is stored under there
+            action = next(action for action, child in root.children.items() if child is best_move)
+            if action != best_move.action:
+                best_move = copy.copy(best_move)
+                best_move.action = action
+        return best_move
+
+    def set_root(self, initial_state):
+        # Keep the tree from earlier searches when advance() has followed the
+        # game to this position, otherwise start a new one
+        if self.root is None or self.root.board.key() != initial_state.key():
+            self.root = Node(initial_state, None)
+            if self.solver and self.root.is_terminal:
+                self.root.proven = initial_state.result(self.perspective)
+            if self.store is not None:
+                self.seed_from_store(self.root)
+            if self.symmetry_depth > 0:
+                self.collapse_symmetries(self.root)
+        elif (self.root.proven is not None and not self.root.is_terminal
+              and not any(child.proven == self.root.proven for child in self.root.children.values())):
+            # a node restored from recycled statistics has its value but none
+            # of the moves that proved it, so it is searched again
+            self.root.proven = None
+        if self.max_nodes is not None or self.max_bytes is not None:
+            self.set_node_budget()
+
+    def set_node_budget(self):
+        budget = self.max_nodes
+        if self.max_bytes is not None:
+            by_size = self.max_bytes // node_bytes(self.root)
+            budget = by_size if budget is None else min(budget, by_size)
+        # room for the root's children, which are never recycled
+        self.node_budget = max(budget, 1 + len(self.root.children) + len(self.root.untried_actions))
+        # a tree kept by advance() has to be counted again
+        self.node_count = self.subtree_size(self.root)
+        if self.node_count >= self.node_budget:
+            self.recycle()
+
+    def subtree_size(self, node):
+        size = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            size += 1
+            stack.extend(node.children.values())
+        return size
+
+    def in_use(self):
+        # nodes a recycling pass must keep: the path being selected
+        return getattr(self, 'path', ())
+
+    def recycle(self):
+        # Drop the subtrees with the fewest visits until RECYCLE_FRACTION of
+        # the budget is free. Visits never grow from a node to its children,
+        # so the nodes at or under a visit threshold form whole subtrees; the
+        # threshold is the visit count of the target-th least visited node.
+        # The subtrees of proven nodes are never selected again and go first.
+        # The proven nodes themselves stay, with one child proving the value so
+        # that a move can still be chosen once advance() makes one the root.
+        self.recycle_passes += 1
+        kept = {id(node) for node in self.in_use()}
+        visits = []
+        stack = [child for child in self.root.children.values()]
+        while stack:
+            node = stack.pop()
+            if node.proven is not None and id(node) not in kept:
+                proof = next(((action, child) for action, child in node.children.items()
+                              if child.proven == node.proven), None)
+                size = self.subtree_size(node) - 1
+                node.children = {}
+                if proof is not None:
+                    action, child = proof
+                    node.children[action] = child
+                    size -= self.subtree_size(child)
+                    stack.append(child)
+                self.node_count -= size
+                self.recycled_nodes += size
+                continue
+            for child in node.children.values():
+                if id(child) not in kept and child.proven is None:
+                    visits.append(child.visits)
+                stack.append(child)
+        target = self.node_count - int(self.node_budget * (1 - RECYCLE_FRACTION))
+        if not visits or target <= 0:
+            return
+        visits.sort()
+        threshold = visits[min(target, len(visits)) - 1]
+
+        stack = [child for child in self.root.children.values()]
+        while stack:
+            node = stack.pop()
+            for action, child in list(node.children.items()):
+                if child.visits > threshold or id(child) in kept or child.proven is not None:
+                    stack.append(child)
+                    continue
+                del node.children[action]
+                if node.recycled is None:
+                    node.recycled = {}
+                node.recycled[action] = (child.visits, child.score, child.proven)
+                # tried again once the moves never expanded have been
+                node.untried_actions.insert(0, action)
+                node.is_fully_expanded = False
+                size = self.subtree_size(child)
+                self.node_count -= size
+                self.recycled_nodes += size
+
+    def advance(self, action):
+        # Re-root on the child reached by action once it has been played. Its
+        # subtree and statistics are kept, the rest of the tree is dropped.
+        if self.root is None:
+            return
+        child = self.root.children.get(action)
+        if child is not None:
+            child.parent = None
+        self.root = child
+
     def select(self, node):
-        while not node.is_terminal:
+        self.path = [node]
+        while not node.is_terminal and node.proven is None:
             if node.is_fully_expanded:
-                node = self.get_best_move(node, 2)
+                child = self.get_best_move(node, self.exploration)
+                if child is None:
+                    # every child was proven through another parent of a shared node
+                    self.prove(node)
+                    return node
+                node = child
             else:
-                return self.expand(node)
+                node = self.expand(node)
+                self.path.append(node)
+                return node
+            self.path.append(node)
         return node
     
     def expand(self, node):
-        states = node.board.legal_moves()
-        for state in states:
-            if str(state.position) not in node.children:
-                new_node = Node(state, node)
-                node.children[str(state.position)] = new_node
-
-                if len(states) == len(node.children):
-                    node.is_fully_expanded = True
-                return new_node
+        if self.node_budget is not None and self.node_count >= self.node_budget:
+            self.recycle()
+        action = node.untried_actions.pop()
+        board = node.board.copy()
+        board.apply(action)
+        if self.transpositions is None:
+            new_node = Node(board, node, action)
+            self.node_count += 1
+            if node.recycled is not None and action in node.recycled:
+                new_node.visits, new_node.score, new_node.proven = node.recycled.pop(action)
+            elif self.store is not None:
+                self.seed_from_store(new_node, node.visits)
+        else:
+            new_node = self.transpositions.get(board.zobrist)
+            if new_node is None:
+                new_node = Node(board, node, action)
+                self.transpositions.put(board.zobrist, new_node)
+                if self.store is not None:
+                    self.seed_from_store(new_node, node.visits)
+        if self.solver and new_node.is_terminal:
+            new_node.proven = board.result(self.perspective)
+        if (self.symmetry_depth and new_node.equivalent_actions is None
+                and board.ply() - self.root.board.ply() < self.symmetry_depth):
+            self.collapse_symmetries(new_node)
+        node.children[action] = new_node
+
+        if not node.untried_actions:
+            node.is_fully_expanded = True
+        return new_node
     
+    def collapse_symmetries(self, node):
+        # Keep one untried move per canonical key of the position it leads to
+        # and remember the others. Only worth it near the root: deeper
+        # positions are rarely symmetric.
+        representatives = {}
+        equivalents = {}
+        for action in node.untried_actions:
+            board = node.board.copy()
+            board.apply(action)
+            key = board.canonical_key()
+            representative = representatives.setdefault(key, action)
+            if representative != action:
+                equivalents.setdefault(representative, []).append(action)
+        node.equivalent_actions = equivalents
+        if equivalents:
+            kept = set(representatives.values())
+            node.untried_actions = [action for action in node.untried_actions if action in kept]
+
+    def seed_from_store(self, node, max_visits=None):
+        # Start a new node from its stored statistics. A child never gets more
+        # visits than its parent has, which keeps the UCT exploration term real.
+        prior = self.store.get(node.board.zobrist)
+        if prior is None:
+            return
+        visits, score = prior
+        if max_visits is not None and visits > max_visits:
+            visits, score = max_visits, round(score * max_visits / visits)
+        node.visits += visits
+        node.score += score if node.player == self.perspective else -score
+
+    def simulate(self, board):
+        if self.simulator is None:
+            return self.rollout(board), 1
+        results = self.simulator(board, self.playouts, self.perspective)
+        return int(results.sum()), len(results)
+
     def rollout(self, board):
-        while not board.is_win():
-            try:
-                board = random.choice(board.legal_moves())
-            except:
-                return 0
-        if board.player_2 == 'HUMAN': 
-            return 1
-        return -1
+        return self.playout(board).result(self.perspective)
+
+    def playout(self, board):
+        # a copy of board played to the end with random moves
+        board = board.copy()
+        policy = self.policy
+        if policy is None:
+            while not board.is_terminal():
+                board.apply(random.choice(board.legal_actions()))
+        else:
+            while not board.is_terminal():
+                board.apply(policy(board))
+        return board
                 
-    def backpropagate(self, node, score):
+    def backpropagate(self, node, score, visits=1):
+        if self.transpositions is not None:
+            # a shared node has several parents, only the selected path is updated
+            parent = None
+            for node in self.path:
+                node.visits += visits
+                node.score += score
+                if parent is not None:
+                    if parent.edge_visits is None:
+                        parent.edge_visits = {}
+                    parent.edge_visits[node] = parent.edge_visits.get(node, 0) + visits
+                parent = node
+            return
         while node is not None:
-            node.visits += 1
+            node.visits += visits
             node.score += score
             node = node.parent
     
+    def propagate_proof(self):
+        # The leaf at the end of self.path is proven; prove its ancestors for
+        # as long as their value follows from their children
+        for node in reversed(self.path[:-1]):
+            if node.proven is None and not self.prove(node):
+                return
+
+    def prove(self, node):
+        # A node is won for the player to move as soon as one child is a
+        # proven win for them; otherwise it is proven only once every move
+        # has been expanded and proven, and takes the best of those values
+        mover = 1 if node.board.player_1 == self.perspective else -1
+        best = None
+        all_proven = node.is_fully_expanded
+        for child in node.children.values():
+            if child.proven is None:
+                all_proven = False
+            elif child.proven * mover == 1:
+                node.proven = child.proven
+                return True
+            elif best is None or child.proven * mover > best * mover:
+                best = child.proven
+        if all_proven and best is not None:
+            node.proven = best
+            return True
+        return False
+
+    def build_root(self, initial_state, stats):
+        # Root Node with one child per action from {action: (visits, score, proven)}.
+        # The root is proven when the children's proven values settle it.
+        root = Node(initial_state, None)
+        for action, (visits, score, proven) in stats.items():
+            board = initial_state.copy()
+            board.apply(action)
+            child = Node(board, root, action)
+            child.visits = visits
+            child.score = score
+            child.proven = proven
+            root.children[action] = child
+            root.visits += visits
+            root.score += score
+        root.untried_actions = [action for action in root.untried_actions if action not in stats]
+        root.is_fully_expanded = not root.untried_actions
+        self.prove(root)
+        return root
+
     def get_best_move(self, node, exploration_constant):
         best_score = float('-inf')
         best_moves = []
+        # every child was reached by a move of the player to move at node
+        current_player = 1 if node.board.player_1 == self.perspective else -1
+        log_visits = math.log(node.visits)
+        # in a DAG a shared child's visits also count other parents' selections,
+        # so exploration uses how often this parent chose it
+        edge_visits = node.edge_visits
 
         for child_node in node.children.values():
-            if child_node.board.player_2 == 'HUMAN': current_player = 1
-            elif child_node.board.player_2 == 'AI': current_player = -1
-
-            exploration = exploration_constant * math.sqrt(math.log(node.visits / child_node.visits))   
-            exploitation = current_player * child_node.score / child_node.visits                                  
+            if child_node.proven is None:
+                exploitation = current_player * child_node.score / child_node.visits
+            elif exploration_constant:
+                # proven subtrees need no more playouts
+                continue
+            else:
+                exploitation = current_player * child_node.proven
+            visits = child_node.visits if edge_visits is None else edge_visits[child_node]
+            exploration = exploration_constant * math.sqrt(log_visits - math.log(visits))
             move_score = exploitation + exploration
             child_node.uct = move_score
             
@@ -85,4 +576,6 @@ class MCTS():
                 best_moves = [child_node]
             elif move_score == best_score:
                 best_moves.append(child_node)
-        return random.choice(best_moves)
\ No newline at end of file
+        if not best_moves:
+            return None
+        return random.choice(best_moves)
@@ -0,0 +1,158 @@
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from mcts import MCTS
+
+def root_search(mcts_class, options, initial_state, iterations, time_budget_ms, seed):
+    # Runs in a worker process: an independent search, reduced to root statistics
+    random.seed(seed)
+    if 'batch_rollout' in sys.modules:
+        sys.modules['batch_rollout'].seed(seed)
+    mcts = mcts_class(verbose=False, **options)
+    _, children = mcts.search(initial_state, iterations, time_budget_ms)
+    if mcts.store is not None:
+        # the store arrived pickled with its own connection; write what this
+        # worker collected before the process moves on to another task
+        mcts.store.close()
+    return {action: (child.visits, child.score, child.proven) for action, child in children.items()}
+
+class RootParallelMCTS(MCTS):
+    # Root parallelism: each worker grows its own tree from the same position
+    # with its own seed, and the root children's visits and scores are summed
+    # by move. A move proven by any worker keeps its proven value. Extra keyword options are passed on to the workers' mcts_class.
+    def __init__(self, workers=None, iterations_per_worker=None, mcts_class=MCTS, seed=None,
+                 perspective='HUMAN', verbose=True, **options):
+        super().__init__(perspective=perspective, verbose=verbose)
+        self.workers = workers or os.cpu_count()
+        self.iterations_per_worker = iterations_per_worker
+        self.mcts_class = mcts_class
+        self.seed = seed
+        self.options = dict(options, perspective=perspective)
+        self.executor = None
+
+    def search(self, initial_state, max_iterations=1000, time_budget_ms=None):
+        # max_iterations is split across the workers unless iterations_per_worker
+        # is set; every worker gets the whole time budget
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        iterations = self.iterations_per_worker
+        if iterations is None and max_iterations is not None:
+            iterations = -(-max_iterations // self.workers)
+        base_seed = self.seed if self.seed is not None else random.getrandbits(32)
+        if self.seed is not None:
+            self.seed += self.workers
+
+        start_time = time.time()
+        futures = [self.executor.submit(root_search, self.mcts_class, self.options,
+                                        initial_state, iterations, time_budget_ms, base_seed + worker)
+                   for worker in range(self.workers)]
+        stats = {}
+        for future in futures:
+            for action, (visits, score, proven) in future.result().items():
+                total_visits, total_score, total_proven = stats.get(action, (0, 0, None))
+                stats[action] = (total_visits + visits, total_score + score,
+                                 proven if total_proven is None else total_proven)
+
+        self.root = self.build_root(initial_state, stats)
+        best_move = self.choose_move(self.root)
+        children = self.root.children
+
+        if self.verbose:
+            print(f"Time taken: {time.time() - start_time}")
+        return best_move, children
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+class TreeParallelMCTS(MCTS):
+    # Tree parallelism: worker threads share one tree. Selection, expansion and
+    # backpropagation hold self.lock, so every Node.visits/Node.score update is
+    # serialized; simulate() runs outside it, which is where the threads
+    # overlap (NumPy batches release the GIL, free-threaded builds need no GIL).
+    # Virtual loss marks the path of an unfinished playout as lost so that
+    # concurrent selections spread over different paths.
+    def __init__(self, threads=4, virtual_loss=1, **options):
+        super().__init__(**options)
+        if self.solver:
+            # proofs are propagated by iterate(), which the worker threads do not run
+            raise ValueError("TreeParallelMCTS does not support solver")
+        if self.transpositions is not None:
+            # threads follow node.parent, a DAG needs each thread's selected path
+            raise ValueError("TreeParallelMCTS does not support transpositions")
+        self.threads = threads
+        self.virtual_loss = virtual_loss
+        self.lock = threading.Lock()
+        # leaves selected by some thread and not yet backpropagated
+        self.in_flight = []
+
+    def search(self, initial_state, max_iterations=1000, time_budget_ms=None):
+        self.set_root(initial_state)
+        self.remaining = max_iterations
+        self.deadline = None if time_budget_ms is None else time.monotonic() + time_budget_ms / 1000
+
+        start_time = time.time()
+        workers = [threading.Thread(target=self.work) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        best_move = self.choose_move(self.root)
+        children = self.root_children()
+
+        if self.verbose:
+            print(f"Time taken: {time.time() - start_time}")
+        return best_move, children
+
+    def work(self):
+        while True:
+            with self.lock:
+                if self.remaining == 0:
+                    return
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    return
+                if self.remaining is not None:
+                    self.remaining -= 1
+                node = self.select(self.root)
+                self.in_flight.append(node)
+            score, visits = self.simulate(node.board)
+            with self.lock:
+                self.in_flight.remove(node)
+                self.backpropagate(node, score, visits)
+
+    def in_use(self):
+        # the paths of the other threads' playouts hold a virtual loss, and
+        # recycling them would freeze it into their parent's recycled stats
+        nodes = list(super().in_use())
+        for node in self.in_flight:
+            while node is not None:
+                nodes.append(node)
+                node = node.parent
+        return nodes
+
+    def select(self, node):
+        leaf = super().select(node)
+        node = leaf
+        while node is not None:
+            node.visits += self.virtual_loss
+            if node.player == self.perspective:
+                node.score -= self.virtual_loss
+            else:
+                node.score += self.virtual_loss
+            node = node.parent
+        return leaf
+
+    def backpropagate(self, node, score, visits=1):
+        # replaces the virtual loss added in select with the real result
+        while node is not None:
+            node.visits += visits - self.virtual_loss
+            if node.player == self.perspective:
+                node.score += score + self.virtual_loss
+            else:
+                node.score += score - self.virtual_loss
+            node = node.parent
@@ -0,0 +1,100 @@
+import math
+import random
+from mcts import MCTS
+
+class RaveMCTS(MCTS):
+    # Rapid Action Value Estimation. Every node keeps all-moves-as-first
+    # (AMAF) statistics: a playout through the node counts for each action
+    # the player to move there played later in the selection path or the
+    # playout, as if it had been played first. Selection blends a child's own
+    # value with its action's AMAF value, weighting AMAF by
+    #   beta = sqrt(rave_equivalence / (3 * visits + rave_equivalence))
+    # which fades as the child gathers visits of its own. For Connect Four an
+    # action is a column, for Tic-Tac-Toe a square.
+    def __init__(self, rave_equivalence=100, **options):
+        super().__init__(**options)
+        if self.simulator is not None:
+            raise ValueError("RAVE needs the moves of each playout, batched simulators do not report them")
+        self.rave_equivalence = rave_equivalence
+        self.playout_actions = []
+
+    def iterate(self):
+        # a proven leaf is not played out and contributes no playout moves
+        self.playout_actions = []
+        super().iterate()
+
+    def simulate(self, board):
+        board = board.copy()
+        actions = []
+        policy = self.policy
+        while not board.is_terminal():
+            action = random.choice(board.legal_actions()) if policy is None else policy(board)
+            board.apply(action)
+            actions.append(action)
+        self.playout_actions = actions
+        return board.result(self.perspective), 1
+
+    def backpropagate(self, node, score, visits=1):
+        super().backpropagate(node, score, visits)
+        path = self.path
+        # the actions played from path[0] on: the selected moves, then the playout
+        actions = [self.action_between(parent, child) for parent, child in zip(path, path[1:])]
+        actions += self.playout_actions
+        for depth, path_node in enumerate(path[:len(actions)]):
+            if path_node.amaf is None:
+                path_node.amaf = {}
+            amaf = path_node.amaf
+            seen = set()
+            # every other action from here on was played by the player to move at node
+            for action in actions[depth::2]:
+                if action in seen:
+                    continue
+                seen.add(action)
+                stats = amaf.get(action)
+                if stats is None:
+                    amaf[action] = [visits, score]
+                else:
+                    stats[0] += visits
+                    stats[1] += score
+
+    def action_between(self, parent, child):
+        if self.transpositions is None:
+            return child.action
+        # a shared node's action is the one of the parent that created it
+        for action, node in parent.children.items():
+            if node is child:
+                return action
+
+    def get_best_move(self, node, exploration_constant):
+        if not exploration_constant:
+            # the move actually played is chosen on the child's own statistics
+            return super().get_best_move(node, exploration_constant)
+        best_score = float('-inf')
+        best_moves = []
+        current_player = 1 if node.board.player_1 == self.perspective else -1
+        log_visits = math.log(node.visits)
+        edge_visits = node.edge_visits
+        amaf = node.amaf or {}
+        rave_equivalence = self.rave_equivalence
+
+        for action, child_node in node.children.items():
+            if child_node.proven is not None:
+                continue
+            value = child_node.score / child_node.visits
+            stats = amaf.get(action)
+            if stats is not None:
+                beta = math.sqrt(rave_equivalence / (3 * child_node.visits + rave_equivalence))
+                value = (1 - beta) * value + beta * stats[1] / stats[0]
+            visits = child_node.visits if edge_visits is None else edge_visits[child_node]
+            exploration = exploration_constant * math.sqrt(log_visits - math.log(visits))
+            move_score = current_player * value + exploration
+            child_node.uct = move_score
+
+            if move_score > best_score:
+                best_score = move_score
+                best_moves = [child_node]
+            elif move_score == best_score:
+                best_moves.append(child_node)
+        if not best_moves:
+            return None
+        return random.choice(best_moves)
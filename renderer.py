@@ -0,0 +1,58 @@
+import pygame
+
+class Renderer():
+    # Drawing layer for the pygame front ends. The board is split into cells
+    # (any hashable key with a rect); draw_cell() is given everything a cell
+    # should show and only repaints it, over the cached background, when that
+    # differs from what was last drawn. Repainted rects are collected and
+    # present() hands just those to pygame.display.update, so a frame where
+    # nothing changed costs a few tuple comparisons. Text is rendered once per
+    # (font, text, color) and the surfaces are reused.
+    def __init__(self, screen, background, max_glyphs=1024):
+        self.screen = screen
+        self.background = background
+        # visit counts change every frame during a search, so the cache is
+        # emptied when it fills up rather than growing without bound
+        self.max_glyphs = max_glyphs
+        self.glyphs = {}
+        self.drawn = {}
+        self.dirty = []
+        self.redraw()
+
+    def glyph(self, font, text, color):
+        key = (font, text, color)
+        surface = self.glyphs.get(key)
+        if surface is None:
+            if len(self.glyphs) >= self.max_glyphs:
+                self.glyphs.clear()
+            surface = font.render(text, True, color)
+            self.glyphs[key] = surface
+        return surface
+
+    def draw_cell(self, key, rect, items):
+        # items is a tuple of (font, text, color, center) drawn in order
+        if self.drawn.get(key) == items:
+            return
+        self.drawn[key] = items
+        self.screen.blit(self.background, rect, rect)
+        # glyphs stay inside the cell, which is all that gets updated
+        self.screen.set_clip(rect)
+        for font, text, color, center in items:
+            surface = self.glyph(font, text, color)
+            self.screen.blit(surface, surface.get_rect(center=center))
+        self.screen.set_clip(None)
+        self.dirty.append(rect)
+
+    def draw_line(self, color, start, end, width):
+        self.dirty.append(pygame.draw.line(self.screen, color, start, end, width))
+
+    def redraw(self):
+        # repaint the whole screen from the background on the next present()
+        self.screen.blit(self.background, (0, 0))
+        self.drawn.clear()
+        self.dirty = [self.screen.get_rect()]
+
+    def present(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
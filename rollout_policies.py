@@ -0,0 +1,89 @@
+import random
+from bisect import bisect
+from connect4 import ConnectFour, COLUMN_COUNT, COLUMN_HEIGHT, BOTTOM_BITS, TOP_BITS
+
+# A rollout policy maps a non-terminal board to the move to play in a
+# playout: MCTS(policy=...) plays playouts with it instead of uniform moves.
+
+BOTTOM_MASK = sum(1 << bit for bit in BOTTOM_BITS)
+# every playable cell, without the sentinel row
+BOARD_MASK = sum(((1 << (COLUMN_HEIGHT - 1)) - 1) << bit for bit in BOTTOM_BITS)
+# centre columns take part in more lines, so they are played more often
+CENTER_WEIGHTS = (1, 2, 3, 4, 3, 2, 1)
+
+def legal_mask_columns():
+    # (columns, cumulative weights) for every set of open columns, by bitmask
+    table = []
+    for legal in range(1 << COLUMN_COUNT):
+        columns = [col for col in range(COLUMN_COUNT) if legal >> col & 1]
+        cumulative = []
+        total = 0
+        for col in columns:
+            total += CENTER_WEIGHTS[col]
+            cumulative.append(total)
+        table.append((columns, cumulative))
+    return table
+
+CENTER_TABLE = legal_mask_columns()
+
+def uniform(board):
+    return random.choice(board.legal_actions())
+
+def center_biased(board):
+    # Connect Four column drawn with CENTER_WEIGHTS among the open columns
+    assert isinstance(board, ConnectFour), "center_biased plays Connect Four only"
+    heights = board.heights
+    legal = 0
+    for col in range(COLUMN_COUNT):
+        if heights[col] < TOP_BITS[col]:
+            legal |= 1 << col
+    columns, cumulative = CENTER_TABLE[legal]
+    return columns[bisect(cumulative, random.random() * cumulative[-1])]
+
+def winning_cells(position, occupied):
+    # Empty cells that would complete a line of four for position. The
+    # sentinel row keeps shifted lines from wrapping between columns.
+    cells = (position << 1) & (position << 2) & (position << 3)
+    for shift in (COLUMN_HEIGHT, COLUMN_HEIGHT - 1, COLUMN_HEIGHT + 1):
+        pair = (position << shift) & (position << 2 * shift)
+        cells |= pair & (position << 3 * shift)
+        cells |= pair & (position >> shift)
+        pair = (position >> shift) & (position >> 2 * shift)
+        cells |= pair & (position << shift)
+        cells |= pair & (position >> 3 * shift)
+    return cells & (BOARD_MASK ^ occupied)
+
+def column_of(cells):
+    return ((cells & -cells).bit_length() - 1) // COLUMN_HEIGHT
+
+def tactical(board):
+    # Connect Four: play an immediate win, otherwise block the opponent's
+    # immediate win, otherwise a uniform move among those that do not fill
+    # the cell under an opponent's winning cell. Threats come from a few
+    # shifts of the two bitboards rather than an is_win() per candidate.
+    assert isinstance(board, ConnectFour), "tactical plays Connect Four only"
+    side = len(board.moves) & 1
+    mover = board.bitboards[side]
+    opponent = board.bitboards[side ^ 1]
+    occupied = mover | opponent
+    playable = (occupied + BOTTOM_MASK) & BOARD_MASK
+
+    wins = winning_cells(mover, occupied) & playable
+    if wins:
+        return column_of(wins)
+    threats = winning_cells(opponent, occupied)
+    blocks = threats & playable
+    if blocks:
+        # with two of them the game is lost anyway
+        return column_of(blocks)
+    safe = playable & ~(threats >> 1)
+    if not safe:
+        safe = playable
+    columns = []
+    while safe:
+        cell = safe & -safe
+        columns.append((cell.bit_length() - 1) // COLUMN_HEIGHT)
+        safe ^= cell
+    return random.choice(columns)
+
+POLICIES = {'uniform': uniform, 'center': center_biased, 'tactical': tactical}
@@ -0,0 +1,139 @@
+import sqlite3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS positions (
+    zobrist INTEGER PRIMARY KEY,
+    visits REAL NOT NULL,
+    score REAL NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS positions_age ON positions (generation, visits);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+def signed(zobrist):
+    # SQLite integers are signed 64-bit
+    return zobrist - (1 << 64) if zobrist >= 1 << 63 else zobrist
+
+class StatsStore():
+    # Visit and score totals of positions searched in earlier games, in an
+    # SQLite file keyed by Zobrist hash. Scores are kept for the player who
+    # moved into the position, so they do not depend on the perspective of
+    # the search that produced them.
+    #
+    # Every flush() is one generation. Stored totals decay by decay per
+    # generation, applied lazily when a row is read or updated, and once the
+    # file holds more than max_entries rows the oldest, least visited ones are
+    # dropped. get() hands out priors scaled by weight and capped at
+    # max_visits, so stored experience never outweighs a fresh search.
+    def __init__(self, path, max_entries=200000, decay=0.95, weight=0.5, max_visits=1000, min_visits=4):
+        self.path = path
+        self.max_entries = max_entries
+        self.decay = decay
+        self.weight = weight
+        self.max_visits = max_visits
+        # nodes with fewer visits are not worth a row
+        self.min_visits = min_visits
+        self.connect()
+
+    def connect(self):
+        self.connection = sqlite3.connect(self.path)
+        self.connection.create_function('power_decay', 1, lambda age: self.decay ** age, deterministic=True)
+        self.connection.executescript(SCHEMA)
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        self.generation = 0 if row is None else row[0]
+        # {zobrist: (visits, score)} collected since the last flush
+        self.pending = {}
+        # {zobrist: (visits, score)} handed out by get(), not to be stored again
+        self.priors = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, zobrist):
+        # (visits, score) prior for the position, score for the player who
+        # moved into it, or None when it has no usable record
+        row = self.connection.execute("SELECT visits, score, generation FROM positions WHERE zobrist = ?",
+                                      (signed(zobrist),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        visits, score, generation = row
+        scale = self.weight * self.decay ** (self.generation - generation)
+        if visits * scale > self.max_visits:
+            scale = self.max_visits / visits
+        prior = (int(visits * scale), round(score * scale))
+        if prior[0] == 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.priors[zobrist] = prior
+        return prior
+
+    def collect(self, root, perspective):
+        # Note the statistics of the subtree under root, less the priors the
+        # nodes were seeded with. Called after every search; a position seen
+        # again keeps its larger record, since a reused tree only grows.
+        stack = [root]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node.visits < self.min_visits or id(node) in seen:
+                continue
+            seen.add(id(node))
+            zobrist = node.board.zobrist
+            prior_visits, prior_score = self.priors.get(zobrist, (0, 0))
+            score = node.score if node.player == perspective else -node.score
+            visits, score = node.visits - prior_visits, score - prior_score
+            if visits > self.pending.get(zobrist, (0, 0))[0]:
+                self.pending[zobrist] = (visits, score)
+            stack.extend(node.children.values())
+
+    def flush(self):
+        # Write everything collected as one transaction and start a new generation
+        if not self.pending:
+            return
+        self.generation += 1
+        with self.connection:
+            self.connection.executemany(
+                '''INSERT INTO positions (zobrist, visits, score, generation) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (zobrist) DO UPDATE SET
+                       visits = positions.visits * power_decay(excluded.generation - positions.generation)
+                                + excluded.visits,
+                       score = positions.score * power_decay(excluded.generation - positions.generation)
+                               + excluded.score,
+                       generation = excluded.generation''',
+                [(signed(zobrist), visits, score, self.generation)
+                 for zobrist, (visits, score) in self.pending.items()])
+            self.connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('generation', ?)",
+                                    (self.generation,))
+            self.evict()
+        self.pending.clear()
+        self.priors.clear()
+
+    def evict(self):
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                '''DELETE FROM positions WHERE zobrist IN
+                   (SELECT zobrist FROM positions ORDER BY generation, visits LIMIT ?)''', (excess,))
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    # connections cannot be pickled; a store sent to a worker process opens its own
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('connection', 'generation', 'pending', 'priors', 'hits', 'misses'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.connect()
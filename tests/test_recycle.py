@@ -0,0 +1,31 @@
+import random
+from connect4 import ConnectFour
+from mcts import MCTS
+from tictactoe import TicTacToe
+
+def self_play(board, iterations, **options):
+    # each side keeps its own bounded tree and follows the game with advance()
+    players = [MCTS(verbose=False, **options) for _ in range(2)]
+    turn = 0
+    while not board.is_terminal():
+        best_move, _ = players[turn].search(board, iterations)
+        assert best_move.action in board.legal_actions()
+        board = best_move.board
+        for player in players:
+            player.advance(best_move.action)
+        turn = 1 - turn
+    return players
+
+def test_recycled_proven_root_can_be_played_from():
+    random.seed(0)
+    recycled = 0
+    for _ in range(20):
+        players = self_play(TicTacToe(), 300, solver=True, max_nodes=60)
+        recycled += sum(player.recycled_nodes for player in players)
+    assert recycled
+
+def test_connect_four_solver_within_node_budget():
+    random.seed(6)
+    players = self_play(ConnectFour(), 1000, solver=True, max_nodes=300)
+    for player in players:
+        assert player.root is None or player.node_count <= player.node_budget
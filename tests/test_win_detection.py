@@ -0,0 +1,38 @@
+import random
+from connect4 import ConnectFour, COLUMN_COUNT, COLUMN_HEIGHT, ROW_COUNT
+from tictactoe import TicTacToe, WIN_MASKS
+
+def connect_four_lines():
+    lines = []
+    for col in range(COLUMN_COUNT):
+        for row in range(ROW_COUNT):
+            for d_col, d_row in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                squares = [(col + i * d_col, row + i * d_row) for i in range(4)]
+                if all(0 <= c < COLUMN_COUNT and 0 <= r < ROW_COUNT for c, r in squares):
+                    lines.append(sum(1 << (c * COLUMN_HEIGHT + r) for c, r in squares))
+    return lines
+
+CONNECT_FOUR_LINES = connect_four_lines()
+
+def full_scan(board, lines):
+    # whether the player who made the last move has any complete line
+    last_moved = board.bitboards[(board.ply() + 1) & 1]
+    return any(last_moved & line == line for line in lines)
+
+def check_random_games(board_class, lines, games, seed):
+    generator = random.Random(seed)
+    for _ in range(games):
+        board = board_class()
+        while not board.is_terminal():
+            board.play(generator.choice(board.legal_actions()))
+            assert board.is_win() == full_scan(board, lines)
+            # take a move back now and then and replay from there
+            if board.ply() > 1 and generator.random() < 0.2:
+                board.undo()
+                assert board.is_win() == full_scan(board, lines)
+
+def test_connect_four_win_matches_full_scan():
+    check_random_games(ConnectFour, CONNECT_FOUR_LINES, 1000, 0)
+
+def test_tictactoe_win_matches_full_scan():
+    check_random_games(TicTacToe, WIN_MASKS, 1000, 0)
@@ -1,63 +1,143 @@
-from copy import deepcopy
 from mcts import *
 
-MAX_ITER = 1000
+MAX_ITER = 20000
+TIME_BUDGET_MS = 500
+
+# Bit pos of a player's mask is set when that player holds square pos
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+)
+FULL_BOARD = 0b111111111
+# The lines through each square, the only ones a piece placed there can complete
+LINES_THROUGH = [[mask for mask in WIN_MASKS if mask >> pos & 1] for pos in range(9)]
+
+def symmetry_tables():
+    # For each of the 7 non-identity rotations and reflections of the board,
+    # a table mapping every 9-bit mask to its image
+    squares = [(pos // 3, pos % 3) for pos in range(9)]
+    transforms = [
+        lambda row, col: (col, 2 - row), lambda row, col: (2 - row, 2 - col), lambda row, col: (2 - col, row),
+        lambda row, col: (row, 2 - col), lambda row, col: (2 - row, col),
+        lambda row, col: (col, row), lambda row, col: (2 - col, 2 - row),
+    ]
+    tables = []
+    for transform in transforms:
+        images = [3 * image_row + image_col for image_row, image_col in (transform(*square) for square in squares)]
+        tables.append([sum(1 << images[pos] for pos in range(9) if mask >> pos & 1) for mask in range(512)])
+    return tables
+
+SYMMETRY_TABLES = symmetry_tables()
+ZOBRIST = zobrist_table(9, 'tictactoe')
+
+class TicTacToe(GameState):
+    __slots__ = ('player_1', 'player_2', 'empty_square', 'bitboards', 'moves', 'zobrist', 'won')
 
-class TicTacToe():
     def __init__(self, board=None):
         self.player_1 = 'HUMAN'
         self.player_2 = 'AI'
         self.empty_square = '_'
-        self.position = {}
-        self.init_board()
+        # bitboards[move_count & 1] always belongs to the player to move (player_1)
+        self.bitboards = [0, 0]
+        self.moves = []
+        self.zobrist = 0
+        # whether the last move completed a line, set by play()
+        self.won = False
         if board is not None:
-            self.__dict__ = deepcopy(board.__dict__)
+            self.player_1 = board.player_1
+            self.player_2 = board.player_2
+            self.bitboards = list(board.bitboards)
+            self.moves = list(board.moves)
+            self.zobrist = board.zobrist
+            self.won = board.won
+
+    @property
+    def move_count(self):
+        return len(self.moves)
+
+    def can_play(self, pos):
+        return not (self.bitboards[0] | self.bitboards[1]) >> pos & 1
+
+    def play(self, pos):
+        side = len(self.moves) & 1
+        bitboard = self.bitboards[side] | 1 << pos
+        self.bitboards[side] = bitboard
+        self.zobrist ^= ZOBRIST[side][pos]
+        self.moves.append(pos)
+        (self.player_1, self.player_2) = (self.player_2, self.player_1)
+        for line in LINES_THROUGH[pos]:
+            if bitboard & line == line:
+                self.won = True
+                break
+
+    def undo(self):
+        pos = self.moves.pop()
+        side = len(self.moves) & 1
+        self.bitboards[side] ^= 1 << pos
+        self.zobrist ^= ZOBRIST[side][pos]
+        (self.player_1, self.player_2) = (self.player_2, self.player_1)
+        # play() stops at a win, so the position before the last move had none
+        self.won = False
+        return pos
+
+    def apply(self, pos):
+        self.play(pos)
 
-    def init_board(self):
-        for pos in range(9):
-            self.position[pos] = self.empty_square
-    
     def make_move(self, pos):
-        board = TicTacToe(self)
-        board.position[pos] = self.player_1
-        (board.player_1, board.player_2) = (board.player_2, board.player_1)
+        board = self.__class__(self)
+        board.play(pos)
         return board
 
     def is_draw(self):
-        for pos in self.position:
-            if self.position[pos] == self.empty_square:
-                return False
-        return True
-    
+        return self.move_count == 9
+
     def is_win(self):
-        # Check horizontal
-        for i in range(0, 9, 3):
-            if self.position[i] == self.position[i+1] == self.position[i+2] == self.player_2:
-                return True
-        # Check vertical
-        for i in range(3):
-            if self.position[i] == self.position[i+3] == self.position[i+6] == self.player_2:
-                return True
-        # Check diagonal
-        if self.position[0] == self.position[4] == self.position[8] == self.player_2:
-            return True
-        if self.position[2] == self.position[4] == self.position[6] == self.player_2:
-            return True
-        return False
-    
-    def legal_moves(self):
-        actions = []
-        for pos in self.position:
-            if self.position[pos] == self.empty_square:
-                actions.append(self.make_move(pos))
-        return actions
+        # player_2 made the last move, play() checked it
+        return self.won
+
+    def key(self):
+        return self.bitboards[0] | self.bitboards[1] << 9
+
+    def ply(self):
+        return self.move_count
+
+    def canonical_key(self):
+        # smallest key() over the 8 symmetries of the square
+        first, second = self.bitboards
+        key = first | second << 9
+        for table in SYMMETRY_TABLES:
+            image = table[first] | table[second] << 9
+            if image < key:
+                key = image
+        return key
+
+    def legal_actions(self):
+        occupied = self.bitboards[0] | self.bitboards[1]
+        return [pos for pos in range(9) if not occupied >> pos & 1]
+
+    @property
+    def position(self):
+        to_move = self.bitboards[self.move_count & 1]
+        last_moved = self.bitboards[(self.move_count + 1) & 1]
+        position = {}
+        for pos in range(9):
+            if to_move >> pos & 1:
+                position[pos] = self.player_1
+            elif last_moved >> pos & 1:
+                position[pos] = self.player_2
+            else:
+                position[pos] = self.empty_square
+        return position
 
     def game_loop(self):
         print('  Type "exit" to quit the game')
         print('  Move format 0 to 8')
         print(self)
 
-        mcts = MCTS()
+        import book
+        opening_book = book.load(book.TICTACTOE_BOOK, book.build_tictactoe)
+        mcts = MCTS(early_stop=True, solver=True, book=opening_book)
         while True:
             user_input = input('> ')
             if user_input == 'exit': break
@@ -66,11 +146,12 @@ class TicTacToe():
             try:
                 pos = int(user_input)
 
-                if self.position[pos] != self.empty_square:
+                if not 0 <= pos < 9 or not self.can_play(pos):
                     print(' Illegal move!')
                     continue
 
                 self = self.make_move(pos)
+                mcts.advance(pos)
                 print(self)
 
                 if self.is_win():
@@ -80,11 +161,12 @@ class TicTacToe():
                     print('Game is drawn!\n')
                     break
 
-                best_move = mcts.search(self, MAX_ITER)
-                print('AI move:', best_move)
+                best_move, _ = mcts.search(self, MAX_ITER, TIME_BUDGET_MS)
+                print('AI move:', best_move.action)
 
                 try:
                     self = best_move.board
+                    mcts.advance(best_move.action)
                     print(self)
                     if self.is_win():
                         print('player "%s" has won the game!\n' % self.player_2)
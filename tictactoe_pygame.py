@@ -1,10 +1,15 @@
 import pygame
 import sys
-from copy import deepcopy
 import time
 from mcts import *
-
-MAX_ITER = 1000
+from tictactoe import TicTacToe as TicTacToeBoard, WIN_MASKS
+from background import BackgroundSearch
+from renderer import Renderer
+import book
+
+MAX_ITER = 20000
+PONDER_MAX_ITER = 100000
+TIME_BUDGET_MS = 500
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 600
 OFFSET = 600
@@ -24,55 +29,7 @@ BUTTON_FONT_SIZE = 20
 BUTTON_WIDTH = 100
 BUTTON_HEIGHT = 50
 
-class TicTacToe():
-    def __init__(self, board=None):
-        self.player_1 = 'HUMAN'
-        self.player_2 = 'AI'
-        self.empty_square = '_'
-        self.position = {}
-        self.init_board()
-        if board is not None:
-            self.__dict__ = deepcopy(board.__dict__)
-
-    def init_board(self):
-        for pos in range(9):
-            self.position[pos] = self.empty_square
-    
-    def make_move(self, pos):
-        board = TicTacToe(self)
-        board.position[pos] = self.player_1
-        (board.player_1, board.player_2) = (board.player_2, board.player_1)
-        return board
-
-    def is_draw(self):
-        for pos in self.position:
-            if self.position[pos] == self.empty_square:
-                return False
-        return True
-    
-    def is_win(self):
-        # Check horizontal
-        for i in range(0, 9, 3):
-            if self.position[i] == self.position[i+1] == self.position[i+2] == self.player_2:
-                return True
-        # Check vertical
-        for i in range(3):
-            if self.position[i] == self.position[i+3] == self.position[i+6] == self.player_2:
-                return True
-        # Check diagonal
-        if self.position[0] == self.position[4] == self.position[8] == self.player_2:
-            return True
-        if self.position[2] == self.position[4] == self.position[6] == self.player_2:
-            return True
-        return False
-    
-    def legal_moves(self):
-        actions = []
-        for pos in self.position:
-            if self.position[pos] == self.empty_square:
-                actions.append(self.make_move(pos))
-        return actions
-
+class TicTacToe(TicTacToeBoard):
     def game_loop(self):
         pygame.init()
         screen = pygame.display.set_mode((SCREEN_WIDTH + OFFSET, SCREEN_HEIGHT))
@@ -81,19 +38,22 @@ class TicTacToe():
         small_font = pygame.font.SysFont(None, SMALL_FONT_SIZE)
         button_font = pygame.font.SysFont(None, BUTTON_FONT_SIZE)
         clock = pygame.time.Clock()
+        renderer = Renderer(screen, self.draw_background(screen))
 
-        self.draw_board(screen, font)
-        pygame.display.flip()
+        self.draw_board(renderer, font, small_font)
+        renderer.present()
         clock.tick(30)
 
-        mcts = MCTS()
+        opening_book = book.load(book.TICTACTOE_BOOK, book.build_tictactoe)
+        search = BackgroundSearch(early_stop=True, solver=True, book=opening_book)
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    search.close()
                     pygame.quit()
                     sys.exit()
 
-                if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.type == pygame.MOUSEBUTTONDOWN and not search.running:
                     pos = pygame.mouse.get_pos()
                     if pos[0] > SCREEN_WIDTH:
                         continue
@@ -101,130 +61,103 @@ class TicTacToe():
                     row = pos[1] // (SCREEN_HEIGHT // 3)
                     move = row * 3 + col
 
-                    if self.position[move] != self.empty_square:
+                    if not self.can_play(move):
                         continue
 
                     self = self.make_move(move)
+                    search.advance(move)
                     
-                    self.draw_board(screen, font)
-                    pygame.display.flip()
-                    clock.tick(30)
+                    self.draw_board(renderer, font, small_font)
+                    renderer.present()
 
                     if self.is_win():
                         winning_combination = self.get_winning_combination()
-                        self.draw_connecting_line(screen, winning_combination) 
+                        self.draw_connecting_line(renderer, winning_combination) 
                         time.sleep(3)                    
+                        search.close()
                         self.end_game_screen(screen, font, button_font, "Human has won!")
                         return
                     elif self.is_draw():
+                        search.close()
                         self.end_game_screen(screen, font, button_font, "Game is drawn!")
                         return
                     
-                    best_move, children = mcts.search(self, MAX_ITER)
-                    list_children =  list((children.values()))
+                    search.start(self, MAX_ITER, TIME_BUDGET_MS, count_existing=True)
 
-                    pygame.display.flip()
-                    clock.tick(30)
+            if search.running:
+                result = search.poll()
+                if result is None:
+                    self.draw_board(renderer, font, small_font, search.live_children())
+                    renderer.present()
+                else:
+                    best_move, children = result
 
-                    try:
-                        self = best_move.board
-                        self.draw_board(screen, font, list_children, small_font)
-                        pygame.display.flip()
-                        clock.tick(30)
+                    self = best_move.board
+                    search.advance(best_move.action)
+                    self.draw_board(renderer, font, small_font, children, best_move.action)
+                    renderer.present()
 
-                        if self.is_win():
-                            winning_combination = self.get_winning_combination()
-                            self.draw_connecting_line(screen, winning_combination) 
-                            time.sleep(3)  
-                            self.end_game_screen(screen, font, button_font, "Machine has won!")
-                            return
-                        elif self.is_draw():
-                            self.end_game_screen(screen, font, button_font, "Game is drawn!")
-                            return
-                    except:
-                        pass
+                    if self.is_win():
+                        winning_combination = self.get_winning_combination()
+                        self.draw_connecting_line(renderer, winning_combination) 
+                        time.sleep(3)  
+                        search.close()
+                        self.end_game_screen(screen, font, button_font, "Machine has won!")
+                        return
+                    elif self.is_draw():
+                        search.close()
+                        self.end_game_screen(screen, font, button_font, "Game is drawn!")
+                        return
+                    search.ponder(self, PONDER_MAX_ITER)
+            clock.tick(30)
 
-    def draw_board(self, screen, font, children=None, small_font=None):
-        screen.fill(BG_COLOR)
+    def draw_background(self, screen):
+        background = pygame.Surface(screen.get_size())
+        background.fill(BG_COLOR)
         for i in range(1, 3):
             # main board
-            pygame.draw.line(screen, LINE_COLOR, (0, i * SCREEN_HEIGHT // 3), (SCREEN_WIDTH, i * SCREEN_HEIGHT // 3), 3)
-            pygame.draw.line(screen, LINE_COLOR, (i * SCREEN_WIDTH // 3, 0), (i * SCREEN_WIDTH // 3, SCREEN_HEIGHT), 3)
+            pygame.draw.line(background, LINE_COLOR, (0, i * SCREEN_HEIGHT // 3), (SCREEN_WIDTH, i * SCREEN_HEIGHT // 3), 3)
+            pygame.draw.line(background, LINE_COLOR, (i * SCREEN_WIDTH // 3, 0), (i * SCREEN_WIDTH // 3, SCREEN_HEIGHT), 3)
             # side board
-            pygame.draw.line(screen, CHILD_SEPLINE_COLOR, (SCREEN_WIDTH, i * SCREEN_HEIGHT // 3), (SCREEN_WIDTH + OFFSET, i * SCREEN_HEIGHT // 3), 3)
-            pygame.draw.line(screen, CHILD_SEPLINE_COLOR, ((i * SCREEN_WIDTH // 3) + OFFSET, 0), ((i * SCREEN_WIDTH // 3) + OFFSET, SCREEN_HEIGHT), 3)
+            pygame.draw.line(background, CHILD_SEPLINE_COLOR, (SCREEN_WIDTH, i * SCREEN_HEIGHT // 3), (SCREEN_WIDTH + OFFSET, i * SCREEN_HEIGHT // 3), 3)
+            pygame.draw.line(background, CHILD_SEPLINE_COLOR, ((i * SCREEN_WIDTH // 3) + OFFSET, 0), ((i * SCREEN_WIDTH // 3) + OFFSET, SCREEN_HEIGHT), 3)
         # separating line
-        pygame.draw.line(screen, LINE_COLOR, (3 * SCREEN_WIDTH // 3, 0), (3 * SCREEN_WIDTH // 3, SCREEN_HEIGHT), 10)
-
+        pygame.draw.line(background, LINE_COLOR, (3 * SCREEN_WIDTH // 3, 0), (3 * SCREEN_WIDTH // 3, SCREEN_HEIGHT), 10)
+        return background
+
+    def draw_board(self, renderer, font, small_font, children=None, best_action=None):
+        # Pieces on the main board; on the side board the pieces in grey and
+        # the search statistics of every child on the square it plays, the
+        # move chosen (best_action, already on the board) in red. children
+        # are keyed by move, so each is placed without comparing boards.
+        children = children or {}
+        cell_width = SCREEN_WIDTH // 3
+        cell_height = SCREEN_HEIGHT // 3
         for pos, symbol in self.position.items():
             col = pos % 3
             row = pos // 3
-            x = col * (SCREEN_WIDTH // 3) + (SCREEN_WIDTH // 3) // 2
-            y = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 2
-
-            x_child = col * (SCREEN_WIDTH // 3) + (SCREEN_WIDTH // 3) // 2 + OFFSET
-            y_child = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 2
-
+            x = col * cell_width + cell_width // 2
+            y = row * cell_height + cell_height // 2
+            y_1 = row * cell_height + cell_height // 3
+            y_2 = row * cell_height + cell_height // 3 * 2
+            # keep clear of the grid lines
+            rect = pygame.Rect(col * cell_width, row * cell_height, cell_width, cell_height).inflate(-8, -8)
+
+            piece = side = ()
             if symbol == 'HUMAN':
-                text = font.render('x', True, PLAYER_HUMAN_COLOR)
-                text_child = font.render('x', True, CHILD_PLAYER_COLOR)
+                piece = ((font, 'x', PLAYER_HUMAN_COLOR, (x, y)),)
+                side = ((font, 'x', CHILD_PLAYER_COLOR, (x + OFFSET, y)),)
             elif symbol == 'AI':
-                text = font.render('o', True, PLAYER_AI_COLOR)
-                text_child = font.render('o', True, CHILD_PLAYER_COLOR)
+                piece = ((font, 'o', PLAYER_AI_COLOR, (x, y)),)
+                side = ((font, 'o', CHILD_PLAYER_COLOR, (x + OFFSET, y)),)
+            renderer.draw_cell(('main', pos), rect, piece)
 
-            else:
-                continue
-            text_rect = text.get_rect(center=(x, y))
-            text_child_rect = text_child.get_rect(center=(x_child, y_child))
-            screen.blit(text, text_rect)
-            screen.blit(text_child, text_child_rect)
-
-        if children is not None:
-            for child in children:
-                similarities = 0
-                for child_pos, child_symbol in child.board.position.items():
-                    for pos, symbol in self.position.items():
-                        if child_pos == pos and child_symbol == symbol:
-                            similarities += 1
-                            if similarities == 9:
-                                best_child = child
-                                break
-                        if child_pos == pos and child_symbol != symbol and symbol == '_':
-                            col = pos % 3
-                            row = pos // 3
-                            x = (col * (SCREEN_WIDTH // 3) + (SCREEN_WIDTH // 3) // 2 + OFFSET)
-                            y_1 = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 3
-                            y_2 = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 3 * 2
-                            visits = small_font.render(f'visits: {child.visits}', True, FONT_COLOR)
-                            uct = small_font.render(f'UCT: {child.uct:.2f}', True, FONT_COLOR)
-                            visits_rect = visits.get_rect(center=(x, y_1))
-                            uct_rect = uct.get_rect(center=(x, y_2))
-                            screen.blit(visits, visits_rect)
-                            screen.blit(uct, uct_rect)
-                            break
-            found = False
-            for child in children:
-                if child != best_child and not found:
-                    found = True
-                    for child_pos, child_symbol in child.board.position.items():
-                        for best_child_pos, best_child_symbol in best_child.board.position.items():
-                            if best_child_pos == child_pos and child_symbol != best_child_symbol and best_child_symbol == 'AI':
-                                col = best_child_pos % 3
-                                row = best_child_pos // 3
-                                x = (col * (SCREEN_WIDTH // 3) + (SCREEN_WIDTH // 3) // 2 + OFFSET)
-                                y = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 2
-                                y_1 = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 3
-                                y_2 = row * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 3 * 2
-                                text = font.render('o', True, (255, 255, 255))
-                                visits = small_font.render(f'visits: {best_child.visits}', True, BEST_CHILD_COLOR)
-                                uct = small_font.render(f'UCT: {best_child.uct:.2f}', True, BEST_CHILD_COLOR)
-                                text_rect = text.get_rect(center=(x, y))
-                                visits_rect = visits.get_rect(center=(x, y_1))
-                                uct_rect = uct.get_rect(center=(x, y_2))
-                                screen.blit(text, text_rect)
-                                screen.blit(visits, visits_rect)
-                                screen.blit(uct, uct_rect)
-                                break
+            child = children.get(pos)
+            if child is not None:
+                color = BEST_CHILD_COLOR if pos == best_action else FONT_COLOR
+                side = ((small_font, f'visits: {child.visits}', color, (x + OFFSET, y_1)),
+                        (small_font, f'UCT: {child.uct:.2f}', color, (x + OFFSET, y_2)))
+            renderer.draw_cell(('side', pos), rect.move(OFFSET, 0), side)
 
     def end_game_screen(self, screen, font, button_font, message):
         screen.fill(BG_COLOR)
@@ -262,27 +195,21 @@ class TicTacToe():
                         sys.exit()
 
     def get_winning_combination(self):
-        for i in range(0, 9, 3):
-            if self.position[i] == self.position[i+1] == self.position[i+2] == self.player_2:
-                return [i, i+1, i+2]
-        for i in range(3):
-            if self.position[i] == self.position[i+3] == self.position[i+6] == self.player_2:
-                return [i, i+3, i+6]
-        if self.position[0] == self.position[4] == self.position[8] == self.player_2:
-            return [0, 4, 8]
-        if self.position[2] == self.position[4] == self.position[6] == self.player_2:
-            return [2, 4, 6]
+        bitboard = self.bitboards[(self.move_count + 1) & 1]
+        for mask in WIN_MASKS:
+            if bitboard & mask == mask:
+                return [pos for pos in range(9) if mask >> pos & 1]
         return None
     
-    def draw_connecting_line(self, screen, winning_combination):
+    def draw_connecting_line(self, renderer, winning_combination):
         start = winning_combination[0]
         end = winning_combination[2]
         start_x = (start % 3) * (SCREEN_WIDTH // 3) + (SCREEN_WIDTH // 3) // 2
         start_y = (start // 3) * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 2
         end_x = (end % 3) * (SCREEN_WIDTH // 3) + (SCREEN_WIDTH // 3) // 2
         end_y = (end // 3) * (SCREEN_HEIGHT // 3) + (SCREEN_HEIGHT // 3) // 2
-        pygame.draw.line(screen, LINE_COLOR, (start_x, start_y), (end_x, end_y), 5)
-        pygame.display.flip()
+        renderer.draw_line(LINE_COLOR, (start_x, start_y), (end_x, end_y), 5)
+        renderer.present()
 
 if __name__ == '__main__':
     board = TicTacToe()
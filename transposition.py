@@ -0,0 +1,51 @@
+import heapq
+from collections import OrderedDict
+
+class TranspositionTable():
+    # Maps a position's Zobrist hash to the Node holding its statistics, so
+    # the same position reached through different move orders is searched
+    # once. Bounded to max_size entries. Evicting an entry only stops sharing:
+    # the node stays in the tree under the parents that already link to it.
+    #   policy='lru'    drops the least recently used entry
+    #   policy='visits' drops the evict_fraction of entries with the fewest visits
+    def __init__(self, max_size=100000, policy='lru', evict_fraction=0.1):
+        if policy not in ('lru', 'visits'):
+            raise ValueError(f"unknown eviction policy {policy!r}")
+        self.max_size = max_size
+        self.policy = policy
+        self.evict_fraction = evict_fraction
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        node = self.entries.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == 'lru':
+            self.entries.move_to_end(key)
+        return node
+
+    def put(self, key, node):
+        self.entries[key] = node
+        if len(self.entries) > self.max_size:
+            self.evict()
+
+    def evict(self):
+        if self.policy == 'lru':
+            self.entries.popitem(last=False)
+            self.evictions += 1
+            return
+        count = max(1, int(self.max_size * self.evict_fraction))
+        for key, _ in heapq.nsmallest(count, self.entries.items(), key=lambda item: item[1].visits):
+            del self.entries[key]
+        self.evictions += count
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)